@@ -22,7 +22,7 @@ try:
     from PyQt5.QtGui import (  # noqa: F401
         QIcon, QPixmap, QPainter, QBrush, QColor, QCursor, QDrag,
         QPen, QPalette, QKeyEvent, QLinearGradient, QKeySequence,
-        QFont, QFontMetrics, QIntValidator, QImage,
+        QFont, QFontMetrics, QIntValidator, QImage, QTextCursor,
     )
     PYQT6 = False
 
@@ -46,6 +46,7 @@ except ImportError:
         QIcon, QPixmap, QPainter, QBrush, QColor, QCursor, QDrag,
         QPen, QPalette, QKeyEvent, QLinearGradient, QKeySequence,
         QFont, QFontMetrics, QIntValidator, QImage, QAction, QShortcut,
+        QTextCursor,
     )
     PYQT6 = True
 
@@ -103,6 +104,10 @@ except ImportError:
     Qt.Window               = Qt.WindowType.Window
     Qt.SubWindow            = Qt.WindowType.SubWindow
 
+    # Timer types
+    Qt.PreciseTimer = Qt.TimerType.PreciseTimer
+    Qt.CoarseTimer  = Qt.TimerType.CoarseTimer
+
     # Widget attributes
     Qt.WA_DeleteOnClose         = Qt.WidgetAttribute.WA_DeleteOnClose
     Qt.WA_TranslucentBackground = Qt.WidgetAttribute.WA_TranslucentBackground
@@ -248,3 +253,6 @@ except ImportError:
     QDialog.Rejected = QDialog.DialogCode.Rejected
 
     QTextEdit.NoWrap = QTextEdit.LineWrapMode.NoWrap
+
+    QTextCursor.Start = QTextCursor.MoveOperation.Start
+    QTextCursor.End   = QTextCursor.MoveOperation.End
@@ -8,6 +8,7 @@ from typing import Optional
 from krita import Krita, Extension, Node  # type: ignore
 from .compat import QComboBox, QHBoxLayout, QIcon, QPixmap, QColor
 from lazy_tools.utils.color_scheme import ColorScheme
+from lazy_tools.utils.layer_utils import COLOR_LABEL_LAYER_TYPES
 
 
 class LazyColorFilter(Extension):
@@ -81,37 +82,28 @@ class LazyColorFilter(Extension):
             if doc:
                 root_node = doc.rootNode()
                 # Toggle visibility of layers with the selected color only
-                self._filter_layers_recursive(root_node, color_filter)
+                self._filter_layers(root_node, color_filter)
 
         except Exception as e:
             print(f"Error applying color filter: {e}")
 
-    def _filter_layers_recursive(self, node: Node, target_color: int):
-        """Recursively toggle visibility of layers with the target color label using Krita's toggle action."""
-        if not node:
-            return
-
-        # Don't process the root node
-        if node.type() == "grouplayer" and node.parentNode() is None:
-            # But still process its children
-            for child in node.childNodes():
-                self._filter_layers_recursive(child, target_color)
-            return
-
-        # Check if this layer has the target color label
-        if node.type() in ["paintlayer", "grouplayer", "vectorlayer", "filterlayer"]:
-            layer_color = node.colorLabel()
+    def _filter_layers(self, root_node: Node, target_color: int):
+        """Toggle visibility of layers with the target color label using Krita's toggle action."""
+        # Explicit stack instead of recursion; children are pushed reversed so
+        # layers are visited in the same top-down order. The root node itself
+        # is never processed, only its descendants.
+        stack = list(reversed(root_node.childNodes()))
+        while stack:
+            node = stack.pop()
 
             # Only modify layers that have the target color label
-            if layer_color == target_color:
+            if node.type() in COLOR_LABEL_LAYER_TYPES and node.colorLabel() == target_color:
                 # Use Krita's built-in toggle action for cleaner visibility management
-                self._toggle_layer_visibility(node)
+                self._toggle_node_visibility(node)
 
-        # Process child nodes
-        for child in node.childNodes():
-            self._filter_layers_recursive(child, target_color)
+            stack.extend(reversed(node.childNodes()))
 
-    def _toggle_layer_visibility(self, node: Node):
+    def _toggle_node_visibility(self, node: Node):
         """Toggle layer visibility using Krita's built-in action."""
         try:
             # Get the current window and view
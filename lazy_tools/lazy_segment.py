@@ -9,28 +9,103 @@ This script demonstrates the workflow of:
 Can be used as both a standalone script and imported module.
 """
 
+import gc
 import os
 import sys
+import json
+import shutil
+import queue
+import hashlib
 import argparse
+import threading
+from collections import OrderedDict
+from multiprocessing import shared_memory
 import numpy as np
 import torch
 from PIL import Image, ImageDraw
 import cv2
-from transformers import AutoProcessor, AutoModelForCausalLM
+from transformers import (
+    AutoProcessor,
+    AutoModelForCausalLM,
+    StoppingCriteria,
+    StoppingCriteriaList,
+)
 from sam2.build_sam import build_sam2
 from sam2.sam2_image_predictor import SAM2ImagePredictor
 
+# Prefix of the one reply line --server mode writes per request; every other
+# stdout line is progress output
+SERVER_REPLY_PREFIX = "[REPLY] "
+
+# Longest side the models see; larger inputs are segmented on a downscaled
+# copy and the masks are scaled back up to the full image
+MAX_INFERENCE_SIDE = 1600
+
+# Bounds of the --server result cache
+RESULT_CACHE_MAX_ENTRIES = 16
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Inference precisions selectable with --dtype; "auto" picks per device
+DTYPES = {"fp32": torch.float32, "fp16": torch.float16, "bf16": torch.bfloat16}
+
+
+class CancelCriteria(StoppingCriteria):
+    """Stop Florence-2 generation as soon as a cancel event is set."""
+
+    def __init__(self, cancel_event):
+        self.cancel_event = cancel_event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full(
+            (input_ids.shape[0],),
+            self.cancel_event.is_set(),
+            dtype=torch.bool,
+            device=input_ids.device,
+        )
+
+
+def resolve_dtype(dtype_name, device):
+    """Map a --dtype choice to a torch dtype for the given device."""
+    if dtype_name in DTYPES:
+        dtype = DTYPES[dtype_name]
+        if device != "cuda" and dtype != torch.float32:
+            # Half precision on CPU is slow or unsupported in several ops
+            print(f"⚠️ {dtype_name} is not supported on CPU, using fp32")
+            return torch.float32
+        return dtype
+    if device == "cuda":
+        # BF16 keeps FP32's range; fall back to FP16 on pre-Ampere GPUs
+        return torch.bfloat16 if _native_bf16_supported() else torch.float16
+    return torch.float32
+
+
+def _native_bf16_supported():
+    """Whether the GPU has native BF16, excluding software emulation."""
+    try:
+        return torch.cuda.is_bf16_supported(including_emulation=False)
+    except TypeError:
+        # PyTorch < 2.3 has no emulation path; check for Ampere or newer
+        return torch.cuda.get_device_capability()[0] >= 8
+
 
 class FloSAM2Pipeline:
     """Florence-2 + SAM2 segmentation pipeline."""
 
-    def __init__(self, sam2_model_key="base_plus"):
+    def __init__(self, sam2_model_key="base_plus", use_mmap=False, dtype="auto"):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"Using device: {self.device}")
 
+        # Inference precision for both models
+        self.dtype_name = dtype
+        self.dtype = resolve_dtype(dtype, self.device)
+        print(f"Using dtype: {self.dtype}")
+
         # Store selected model
         self.sam2_model_key = sam2_model_key
 
+        # Memory-map the SAM2 checkpoint instead of reading it into RAM
+        self.use_mmap = use_mmap
+
         # Set up local model directory
         self.models_dir = os.path.join(os.path.dirname(__file__), "models")
         os.makedirs(self.models_dir, exist_ok=True)
@@ -45,6 +120,9 @@ class FloSAM2Pipeline:
         # Initialize SAM2
         self.sam2_predictor = None
 
+        # threading.Event set by --server mode to abandon the running request
+        self.cancel_event = None
+
         self._load_models()
 
     def _load_models(self):
@@ -65,9 +143,7 @@ class FloSAM2Pipeline:
                 )
                 self.florence_model = AutoModelForCausalLM.from_pretrained(
                     self.florence_model_path,
-                    torch_dtype=(
-                        torch.float32 if self.device == "cpu" else torch.float16
-                    ),
+                    torch_dtype=self.dtype,
                     trust_remote_code=True,
                     local_files_only=True,
                     attn_implementation="eager",  # Fix for _supports_sdpa error
@@ -82,9 +158,7 @@ class FloSAM2Pipeline:
                 )
                 self.florence_model = AutoModelForCausalLM.from_pretrained(
                     "microsoft/Florence-2-large-ft",
-                    torch_dtype=(
-                        torch.float32 if self.device == "cpu" else torch.float16
-                    ),
+                    torch_dtype=self.dtype,
                     trust_remote_code=True,
                     cache_dir=self.models_dir,
                     attn_implementation="eager",  # Fix for _supports_sdpa error
@@ -194,9 +268,7 @@ class FloSAM2Pipeline:
                         print(f"    Config: {os.path.basename(model_cfg)}")
 
                         # Build SAM2 model with full config path
-                        sam2_model = build_sam2(
-                            model_cfg, checkpoint_path, device=self.device
-                        )
+                        sam2_model = self._build_sam2(model_cfg, checkpoint_path)
                         self.sam2_predictor = SAM2ImagePredictor(sam2_model)
                         print(f"✅ SAM2 loaded successfully: {config['name']}")
                         break
@@ -223,6 +295,38 @@ class FloSAM2Pipeline:
             print(f"❌ Error loading SAM2: {e}")
             print("Make sure SAM2 checkpoints are available")
 
+    def cancelled(self):
+        """Whether the running request has been cancelled."""
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def _autocast(self):
+        """Autocast context for SAM2 inference at the selected precision."""
+        return torch.autocast(
+            device_type=self.device,
+            dtype=self.dtype,
+            enabled=self.dtype != torch.float32,
+        )
+
+    def _build_sam2(self, model_cfg, checkpoint_path):
+        """Build SAM2, optionally loading its checkpoint through mmap."""
+        if self.use_mmap:
+            try:
+                # Build without weights, then load a demand-paged state dict;
+                # the pages come from the OS cache shared with other processes
+                sam2_model = build_sam2(model_cfg, None, device=self.device)
+                state_dict = torch.load(
+                    checkpoint_path, map_location="cpu", weights_only=True, mmap=True
+                )["model"]
+                sam2_model.load_state_dict(state_dict)
+                print("    Loaded checkpoint with mmap")
+                return sam2_model
+            except Exception as e:
+                # torch.load(mmap=...) needs PyTorch 2.1+, and some checkpoints
+                # cannot be mapped; retry with a plain read before giving up
+                print(f"    mmap loading failed ({e}), reading checkpoint")
+
+        return build_sam2(model_cfg, checkpoint_path, device=self.device)
+
     def florence_phrase_grounding(self, image, text_prompt):
         """
         Use Florence-2 to find objects matching the text prompt.
@@ -256,10 +360,16 @@ class FloSAM2Pipeline:
 
             # Move inputs to device if not already
             print("  Moving inputs to device...")
+            # The fallback loader may have kept FP32, so follow the model
+            model_dtype = next(self.florence_model.parameters()).dtype
             for key in inputs:
                 if hasattr(inputs[key], "to"):
                     print(f"    Moving {key} to {self.device}")
-                    inputs[key] = inputs[key].to(self.device)
+                    if torch.is_floating_point(inputs[key]):
+                        # Match the model's precision (pixel_values)
+                        inputs[key] = inputs[key].to(self.device, model_dtype)
+                    else:
+                        inputs[key] = inputs[key].to(self.device)
                     print(
                         f"    {key} shape: {inputs[key].shape if hasattr(inputs[key], 'shape') else 'no shape'}"
                     )
@@ -291,9 +401,15 @@ class FloSAM2Pipeline:
                             return []
 
                     print("  Calling generate...")
+                    stopping_criteria = None
+                    if self.cancel_event is not None:
+                        stopping_criteria = StoppingCriteriaList(
+                            [CancelCriteria(self.cancel_event)]
+                        )
                     generated_ids = self.florence_model.generate(
                         input_ids=inputs["input_ids"],
                         pixel_values=inputs["pixel_values"],
+                        stopping_criteria=stopping_criteria,
                         max_new_tokens=1024,
                         do_sample=False,
                         num_beams=1,  # Reduce beam search for CPU
@@ -379,13 +495,14 @@ class FloSAM2Pipeline:
             print(f"❌ Florence grounding error: {e}")
             return []
 
-    def sam2_segmentation(self, image, bboxes):
+    def sam2_segmentation(self, image, bboxes, image_array=None):
         """
         Use SAM2 to generate segmentation masks from bounding boxes.
 
         Args:
             image: PIL Image
             bboxes: List of bounding boxes [[x1, y1, x2, y2], ...]
+            image_array: numpy array of image, optional; avoids converting it again
 
         Returns:
             List of segmentation masks
@@ -397,29 +514,29 @@ class FloSAM2Pipeline:
         try:
             print(f"🎯 SAM2 segmentation for {len(bboxes)} bounding boxes")
 
-            # Convert PIL to numpy array
-            image_array = np.array(image)
-
-            # Set image for SAM2 predictor
-            self.sam2_predictor.set_image(image_array)
+            if image_array is None:
+                image_array = np.asarray(image)
 
-            all_masks = []
-
-            for i, bbox in enumerate(bboxes):
-                # Convert bbox to input box format for SAM2
-                input_box = np.array([bbox])  # SAM2 expects [[x1, y1, x2, y2]]
-
-                # Generate mask
+            # Encode the image once and decode all boxes in a single batch
+            input_boxes = np.array(bboxes, dtype=np.float32)  # [[x1, y1, x2, y2], ...]
+            with torch.inference_mode(), self._autocast():
+                self.sam2_predictor.set_image(image_array)
                 masks, scores, logits = self.sam2_predictor.predict(
                     point_coords=None,
                     point_labels=None,
-                    box=input_box[0],
+                    box=input_boxes,
                     multimask_output=False,
                 )
 
-                # Take the best mask (first one when multimask_output=False)
-                mask = masks[0]
-                score = scores[0]
+            # One mask per box; a single box comes back without the batch axis
+            masks = masks.reshape(len(bboxes), *masks.shape[-2:])
+            scores = scores.reshape(len(bboxes))
+
+            all_masks = []
+
+            for i, bbox in enumerate(bboxes):
+                mask = masks[i]
+                score = scores[i]
 
                 all_masks.append({"mask": mask, "score": score, "bbox": bbox})
 
@@ -432,7 +549,7 @@ class FloSAM2Pipeline:
             print(f"❌ SAM2 segmentation error: {e}")
             return []
 
-    def create_red_mask_overlay(self, image, masks, output_path):
+    def create_red_mask_overlay(self, image, masks, output_path, image_array=None):
         """
         Create red mask overlay on the original image.
 
@@ -440,12 +557,14 @@ class FloSAM2Pipeline:
             image: PIL Image
             masks: List of mask dictionaries from SAM2
             output_path: str, output file path
+            image_array: numpy array of image, optional; avoids converting it again
         """
         try:
             print(f"🎨 Creating red mask overlay with {len(masks)} masks")
 
-            # Convert PIL to numpy
-            image_array = np.array(image)
+            # Copy the pixels so the caller's array is left untouched
+            if image_array is None:
+                image_array = np.asarray(image)
             overlay = image_array.copy()
 
             # Create red overlay for each mask
@@ -475,7 +594,7 @@ class FloSAM2Pipeline:
             print(f"❌ Error creating red mask overlay: {e}")
             return None
 
-    def create_transparent_cutout(self, image, masks, output_path):
+    def create_transparent_cutout(self, image, masks, output_path, image_array=None):
         """
         Create image where everything except segmented targets is transparent.
 
@@ -483,18 +602,13 @@ class FloSAM2Pipeline:
             image: PIL Image
             masks: List of mask dictionaries from SAM2
             output_path: str, output file path
+            image_array: numpy array of image, optional; avoids converting it again
         """
         try:
             print(f"✂️ Creating transparent cutout with {len(masks)} masks")
 
-            # Convert PIL to RGBA (with alpha channel)
-            if image.mode != "RGBA":
-                image_rgba = image.convert("RGBA")
-            else:
-                image_rgba = image.copy()
-
-            # Convert to numpy array
-            image_array = np.array(image_rgba)
+            if image_array is None:
+                image_array = np.asarray(image)
 
             # Create combined mask (union of all masks)
             height, width = image_array.shape[:2]
@@ -511,17 +625,20 @@ class FloSAM2Pipeline:
                 combined_mask = combined_mask | mask
                 print(f"  Added mask {i+1} to cutout")
 
-            # Set alpha channel: 255 (opaque) for segmented areas, 0 (transparent) for background
-            image_array[:, :, 3] = np.where(combined_mask, 255, 0)
+            # Alpha channel: 255 (opaque) for segmented areas, 0 (transparent) for background
+            alpha = np.where(combined_mask, 255, 0).astype(np.uint8)
+            cutout = np.dstack((image_array[:, :, :3], alpha))
 
             # Convert back to PIL and save as PNG (to preserve transparency)
-            result_image = Image.fromarray(image_array, "RGBA")
+            result_image = Image.fromarray(cutout, "RGBA")
 
             # Ensure output is PNG for transparency support
             if not output_path.lower().endswith(".png"):
                 output_path = os.path.splitext(output_path)[0] + ".png"
 
-            result_image.save(output_path, "PNG")
+            # The file is only a handoff to Krita, so favour encode speed
+            # over size; compression is most of the cost of saving
+            result_image.save(output_path, "PNG", compress_level=1)
 
             print(f"✅ Saved transparent cutout: {output_path}")
             return output_path
@@ -530,8 +647,32 @@ class FloSAM2Pipeline:
             print(f"❌ Error creating transparent cutout: {e}")
             return None
 
+    def scale_masks(self, masks, scale, size):
+        """
+        Bring masks computed on a downscaled copy back to the full image size.
+
+        Args:
+            masks: List of mask dictionaries from SAM2
+            scale: float, factor the image was downscaled by
+            size: (width, height) of the full image
+        """
+        scaled = []
+        for mask_data in masks:
+            mask = cv2.resize(
+                mask_data["mask"].astype(np.uint8), size, interpolation=cv2.INTER_NEAREST
+            ).astype(bool)
+            bbox = [coord / scale for coord in mask_data["bbox"]]
+            scaled.append({"mask": mask, "score": mask_data["score"], "bbox": bbox})
+        return scaled
+
     def process_image(
-        self, image_path, text_prompt, output_path=None, output_type="overlay"
+        self,
+        image_path,
+        text_prompt,
+        output_path=None,
+        output_type="overlay",
+        image=None,
+        max_side=MAX_INFERENCE_SIDE,
     ):
         """
         Complete pipeline: Florence grounding + SAM2 segmentation + output generation.
@@ -541,22 +682,45 @@ class FloSAM2Pipeline:
             text_prompt: str, search query (e.g., "girl")
             output_path: str, optional output path
             output_type: str, 'overlay' for red mask or 'cutout' for transparent background
+            image: PIL Image, optional already-loaded input; image_path is then
+                only used to name an auto-generated output
+            max_side: int, longest side the models run at; None for full size
+
+        Returns:
+            str path of the saved result, or None if nothing was produced
         """
         try:
-            print(f"\n🚀 Processing: {image_path}")
+            print(f"\n🚀 Processing: {image_path or 'shared image'}")
             print(f"🔍 Searching for: '{text_prompt}'")
             print(f"📄 Output type: {output_type}")
 
             # Load image
-            if not os.path.exists(image_path):
-                print(f"❌ Image not found: {image_path}")
-                return
+            if image is None:
+                if not os.path.exists(image_path):
+                    print(f"❌ Image not found: {image_path}")
+                    return
 
-            image = Image.open(image_path).convert("RGB")
+                image = Image.open(image_path).convert("RGB")
             print(f"📷 Loaded image: {image.size}")
 
+            # Both models work at about 1024px internally; run them on a
+            # smaller copy of huge images and keep full resolution for output
+            work_image = image
+            scale = 1.0
+            if max_side and max(image.size) > max_side:
+                scale = max_side / max(image.size)
+                work_size = (
+                    max(1, round(image.width * scale)),
+                    max(1, round(image.height * scale)),
+                )
+                work_image = image.resize(work_size, Image.BILINEAR, reducing_gap=2.0)
+                print(f"📐 Segmenting at {work_size}")
+
             # Step 1: Florence phrase grounding
-            grounding_results = self.florence_phrase_grounding(image, text_prompt)
+            grounding_results = self.florence_phrase_grounding(work_image, text_prompt)
+            if self.cancelled():
+                print("⏹️ Cancelled")
+                return
 
             if not grounding_results:
                 print(f"❌ No objects found for '{text_prompt}'")
@@ -565,13 +729,28 @@ class FloSAM2Pipeline:
             # Extract bounding boxes
             bboxes = [result["bbox"] for result in grounding_results]
 
+            # Convert to numpy once; SAM2 and the output step share the array
+            image_array = np.asarray(image)
+
             # Step 2: SAM2 segmentation
-            segmentation_masks = self.sam2_segmentation(image, bboxes)
+            if work_image is image:
+                segmentation_masks = self.sam2_segmentation(image, bboxes, image_array)
+            else:
+                segmentation_masks = self.sam2_segmentation(work_image, bboxes)
+
+            if self.cancelled():
+                print("⏹️ Cancelled")
+                return
 
             if not segmentation_masks:
                 print("❌ No segmentation masks generated")
                 return
 
+            if work_image is not image:
+                segmentation_masks = self.scale_masks(
+                    segmentation_masks, scale, image.size
+                )
+
             # Step 3: Create output based on type
             if not output_path:
                 # Generate output path
@@ -584,11 +763,11 @@ class FloSAM2Pipeline:
 
             if output_type == "cutout":
                 result_path = self.create_transparent_cutout(
-                    image, segmentation_masks, output_path
+                    image, segmentation_masks, output_path, image_array
                 )
             else:
                 result_path = self.create_red_mask_overlay(
-                    image, segmentation_masks, output_path
+                    image, segmentation_masks, output_path, image_array
                 )
 
             if result_path:
@@ -602,10 +781,257 @@ class FloSAM2Pipeline:
                 print(f"  - Objects: {[r['label'] for r in grounding_results]}")
                 print(f"  - Output type: {output_type}")
 
+            return result_path
+
         except Exception as e:
             print(f"❌ Pipeline error: {e}")
 
 
+def load_shared_image(shm_name, width, height):
+    """
+    Build an RGB image from a BGRA buffer shared by the Krita docker.
+
+    Args:
+        shm_name: str, name of the shared memory block
+        width, height: int, image size in pixels
+
+    Returns:
+        PIL Image (RGB)
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    if os.name == "posix":
+        # The docker owns the block; keep this process's resource tracker
+        # from unlinking it on exit
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(shm._name, "shared_memory")
+    try:
+        # PIL's raw BGRX unpacker reorders the channels and drops alpha while
+        # copying the pixels out of the block, in a single pass
+        with shm.buf[: width * height * 4] as bgra:
+            image = Image.frombytes("RGB", (width, height), bgra, "raw", "BGRX")
+    finally:
+        shm.close()
+    return image
+
+
+class ResultCache:
+    """
+    LRU cache of finished results for --server mode.
+
+    Results are copied into cache_dir under a hash of the input pixels and the
+    request options, so re-running the same prompt skips the pipeline.
+    """
+
+    def __init__(
+        self,
+        cache_dir,
+        max_entries=RESULT_CACHE_MAX_ENTRIES,
+        max_bytes=RESULT_CACHE_MAX_BYTES,
+    ):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (cached file path, size)
+        self.total_bytes = 0
+
+        # Files left by an earlier server are not indexed; start empty
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(image, prompt, model_key, output_type, dtype_name):
+        """Hash the input pixels together with everything that shapes the result."""
+        digest = hashlib.blake2b(image.tobytes(), digest_size=16)
+        options = f"{image.size}|{prompt}|{model_key}|{output_type}|{dtype_name}"
+        digest.update(options.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key, output_path):
+        """Copy a cached result next to output_path; return its path or None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        cached_path = entry[0]
+        # Keep the cached extension, as the cutout step forces .png
+        result_path = os.path.splitext(output_path)[0] + os.path.splitext(cached_path)[1]
+        try:
+            shutil.copyfile(cached_path, result_path)
+        except OSError:
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return result_path
+
+    def put(self, key, result_path):
+        """Store a copy of result_path, evicting the oldest results if needed."""
+        cached_path = os.path.join(
+            self.cache_dir, key + os.path.splitext(result_path)[1]
+        )
+        try:
+            shutil.copyfile(result_path, cached_path)
+            size = os.path.getsize(cached_path)
+        except OSError as e:
+            print(f"⚠️ Could not cache result: {e}")
+            return
+
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (cached_path, size)
+        self.total_bytes += size
+
+        while len(self.entries) > self.max_entries or (
+            self.total_bytes > self.max_bytes and len(self.entries) > 1
+        ):
+            self._remove(next(iter(self.entries)))
+
+    def clear(self):
+        """Drop every cached result."""
+        for key in list(self.entries):
+            self._remove(key)
+
+    def _remove(self, key):
+        cached_path, size = self.entries.pop(key)
+        self.total_bytes -= size
+        try:
+            os.remove(cached_path)
+        except OSError:
+            pass
+
+
+def serve(sam2_model_key="base_plus", use_mmap=False, dtype="auto"):
+    """
+    Answer segmentation requests from stdin, keeping the models loaded.
+
+    Each request is one JSON line with prompt, output_path, output_type, model
+    and dtype keys. The input is read from the shared memory block named by
+    shm, width and height, or from image_path. Progress is printed as usual; the request
+    ends with a single SERVER_REPLY_PREFIX line holding {"done": ..., "path": ...}
+    or {"error": ...}. The loop exits when stdin is closed.
+
+    A {"op": "cancel"} line abandons the running request at the next stage
+    boundary; it is then answered with {"cancelled": true} and the server
+    stays up for the next one.
+
+    Results are kept in a ResultCache, so a request repeating an earlier
+    image, prompt and options is answered without running the models.
+    """
+    # Progress has to reach the client while a request is running
+    sys.stdout.reconfigure(line_buffering=True)
+
+    # SAM2 always encodes a fixed 1024x1024 input, so the convolution
+    # algorithms cuDNN picks on the first request pay off for every later one
+    if torch.cuda.is_available():
+        torch.backends.cudnn.benchmark = True
+
+    # stdin is read on its own thread so a cancel arrives while a request runs
+    requests = queue.Queue()
+    cancel_event = threading.Event()
+
+    def read_stdin():
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                if json.loads(line).get("op") == "cancel":
+                    cancel_event.set()
+                    continue
+            except (ValueError, AttributeError):
+                pass  # Reported by the request loop
+            # Cleared in stdin order, so a cancel that follows its request
+            # is never lost
+            cancel_event.clear()
+            requests.put(line)
+        requests.put(None)
+
+    threading.Thread(target=read_stdin, daemon=True).start()
+
+    pipeline = None
+    result_cache = None
+    try:
+        for line in iter(requests.get, None):
+            try:
+                request = json.loads(line)
+                model_key = request.get("model", sam2_model_key)
+                dtype_name = request.get("dtype", dtype)
+                output_path = request.get("output_path")
+                output_type = request.get("output_type", "overlay")
+
+                image = None
+                if request.get("shm"):
+                    image = load_shared_image(
+                        request["shm"], request["width"], request["height"]
+                    )
+                elif os.path.exists(request.get("image_path") or ""):
+                    image = Image.open(request["image_path"]).convert("RGB")
+
+                # Answer repeated requests from the cache without the models
+                cache_key = None
+                result_path = None
+                if image is not None and output_path:
+                    if result_cache is None:
+                        result_cache = ResultCache(
+                            os.path.join(
+                                os.path.dirname(output_path), "krita_segment_cache"
+                            )
+                        )
+                    cache_key = ResultCache.make_key(
+                        image, request["prompt"], model_key, output_type, dtype_name
+                    )
+                    result_path = result_cache.get(cache_key, output_path)
+                    if result_path:
+                        print(f"♻️ Reusing cached result for '{request['prompt']}'")
+
+                if not result_path:
+                    # Reload only when the requested SAM2 variant or precision changes
+                    if (
+                        pipeline is None
+                        or pipeline.sam2_model_key != model_key
+                        or pipeline.dtype_name != dtype_name
+                    ):
+                        # Free the old models first so two Florence+SAM2
+                        # stacks never share the GPU
+                        pipeline = None
+                        gc.collect()
+                        if torch.cuda.is_available():
+                            torch.cuda.empty_cache()
+                        pipeline = FloSAM2Pipeline(
+                            sam2_model_key=model_key,
+                            use_mmap=use_mmap,
+                            dtype=dtype_name,
+                        )
+                        pipeline.cancel_event = cancel_event
+
+                    result_path = pipeline.process_image(
+                        request.get("image_path"),
+                        request["prompt"],
+                        output_path,
+                        output_type,
+                        image=image,
+                    )
+                    if result_path and cache_key:
+                        result_cache.put(cache_key, result_path)
+
+                if cancel_event.is_set():
+                    reply = {"cancelled": True}
+                    if torch.cuda.is_available():
+                        # Hand back what the abandoned request was holding
+                        torch.cuda.empty_cache()
+                elif result_path:
+                    reply = {"done": True, "path": result_path}
+                else:
+                    reply = {"error": "Segmentation produced no output"}
+
+            except Exception as e:
+                reply = {"error": f"Server error: {e}"}
+
+            print(SERVER_REPLY_PREFIX + json.dumps(reply), flush=True)
+    finally:
+        if result_cache is not None:
+            result_cache.clear()
+
+
 def main():
     """Florence-2 + SAM2 segmentation pipeline with command-line arguments."""
     parser = argparse.ArgumentParser(
@@ -618,13 +1044,19 @@ Examples:
   python lazy_segment.py image.png "car" (auto-generate output path)
   python lazy_segment.py image.jpg "girl" --cutout (create transparent cutout)
   python lazy_segment.py image.jpg "car" result.png --cutout (transparent cutout with custom path)
+  python lazy_segment.py --server (read JSON requests from stdin, keep models loaded)
         """,
     )
 
-    parser.add_argument("image_path", help="Path to the input image file")
+    parser.add_argument(
+        "image_path",
+        nargs="?",  # Not used in --server mode
+        help="Path to the input image file",
+    )
 
     parser.add_argument(
         "text_prompt",
+        nargs="?",  # Not used in --server mode
         help="Text prompt to search for in the image (e.g., 'girl', 'car', 'person with hat')",
     )
 
@@ -653,8 +1085,37 @@ Examples:
         help="Choose SAM2 model variant (base_plus or large)",
     )
 
+    parser.add_argument(
+        "--dtype",
+        choices=["auto", *DTYPES],
+        default="auto",
+        help="Inference precision (auto: bf16/fp16 on CUDA, fp32 on CPU)",
+    )
+
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="Memory-map the SAM2 checkpoint instead of reading it (PyTorch 2.1+)",
+    )
+
+    parser.add_argument(
+        "--server",
+        action="store_true",
+        help="Serve JSON requests from stdin instead of processing one image",
+    )
+
     args = parser.parse_args()
 
+    if args.server:
+        try:
+            serve(sam2_model_key=args.model, use_mmap=args.mmap, dtype=args.dtype)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
+    if not args.image_path or not args.text_prompt:
+        parser.error("image_path and text_prompt are required")
+
     print("[SEGMENT] Florence-2 + SAM2 Segmentation Pipeline")
     print("=" * 50)
 
@@ -689,7 +1150,9 @@ Examples:
 
     # Initialize pipeline
     try:
-        pipeline = FloSAM2Pipeline(sam2_model_key=args.model)
+        pipeline = FloSAM2Pipeline(
+            sam2_model_key=args.model, use_mmap=args.mmap, dtype=args.dtype
+        )
 
         # Run the complete pipeline
         pipeline.process_image(
@@ -7,6 +7,11 @@ This module provides utility functions for working with Krita layers and documen
 from typing import Optional, List
 from krita import Krita, Document, Node, Window, View  # type: ignore
 
+# Layer types that carry a color label
+COLOR_LABEL_LAYER_TYPES = frozenset(
+    {"paintlayer", "grouplayer", "vectorlayer", "filterlayer"}
+)
+
 
 def get_current_layer() -> Optional[Node]:
     """
@@ -6,7 +6,10 @@ the widget modules.
 """
 
 import os
+import stat
+import sys
 import tempfile
+from functools import lru_cache
 
 
 # Project paths configuration
@@ -14,14 +17,52 @@ PROJECT_DIR = r"C:\Users\udtre\Projects\krita-plugin\krita-lazy-tools"
 VENV_PYTHON_PATH = os.path.join(PROJECT_DIR, ".venv", "Scripts", "python.exe")
 LAZY_SEGMENT_SCRIPT_PATH = os.path.join(PROJECT_DIR, "lazy_tools", "lazy_segment.py")
 
+
+def _get_temp_dir():
+    """Prefer a RAM-backed directory for the files handed to the server."""
+    # /dev/shm is tmpfs on Linux; other platforms keep the regular temp dir
+    if not (sys.platform.startswith("linux") and os.access("/dev/shm", os.W_OK)):
+        return tempfile.gettempdir()
+
+    # /dev/shm is shared between users, so only use a subdirectory that is
+    # ours alone; anyone could have created this predictable name first.
+    # Otherwise fall back to the regular temp dir, as on other platforms
+    shm_dir = os.path.join("/dev/shm", f"krita_lazy_{os.getuid()}")
+    try:
+        os.mkdir(shm_dir, 0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return tempfile.gettempdir()
+    try:
+        info = os.lstat(shm_dir)
+    except OSError:
+        return tempfile.gettempdir()
+    if (
+        stat.S_ISDIR(info.st_mode)
+        and info.st_uid == os.getuid()
+        and not info.st_mode & (stat.S_IRWXG | stat.S_IRWXO)
+    ):
+        return shm_dir
+    return tempfile.gettempdir()
+
+
 # Temporary file configuration
-TEMP_DIR = tempfile.gettempdir()
-TEMP_INPUT_FILENAME = "krita_segment_input.png"
+TEMP_DIR = _get_temp_dir()
 TEMP_OUTPUT_CUTOUT_FILENAME = "krita_segment_output.png"  # PNG for transparency
 TEMP_OUTPUT_OVERLAY_FILENAME = "krita_segment_output.jpg"  # JPG for overlay
 
 # Environment configuration for subprocess
-SUBPROCESS_ENV_VARS = {"PYTHONIOENCODING": "utf-8", "PYTHONUTF8": "1"}
+SUBPROCESS_ENV_VARS = {
+    "PYTHONIOENCODING": "utf-8",
+    "PYTHONUTF8": "1",
+    "PYTHONNOUSERSITE": "1",  # Only the venv's packages; skips the user site scan
+}
+
+# Persistent segmentation server (lazy_segment.py --server)
+SEGMENT_SERVER_REPLY_PREFIX = "[REPLY] "  # Must match lazy_segment.SERVER_REPLY_PREFIX
+SEGMENT_SERVER_IDLE_TIMEOUT = 600  # Seconds before an idle server is shut down
+SEGMENT_CANCEL_TIMEOUT = 1.0  # Seconds a cancelled request gets before a kill
 
 # UI Configuration
 DEFAULT_OUTPUT_TYPE = "overlay"
@@ -45,15 +86,20 @@ SAM2_MODELS = {
 
 DEFAULT_SAM2_MODEL = "base_plus"
 
+# Inference precision options (lazy_segment.py --dtype)
+SEGMENT_DTYPES = {
+    "auto": "Auto",
+    "fp32": "FP32",
+    "bf16": "BF16",
+    "fp16": "FP16",
+}
+DEFAULT_SEGMENT_DTYPE = "auto"
+
 # File extensions by output type
 OUTPUT_FILE_EXTENSIONS = {"overlay": ".jpg", "cutout": ".png"}
 
 
-def get_temp_input_path():
-    """Get the full path for temporary input file."""
-    return os.path.join(TEMP_DIR, TEMP_INPUT_FILENAME)
-
-
+@lru_cache(maxsize=None)
 def get_temp_output_path(output_type="overlay"):
     """Get the full path for temporary output file based on output type."""
     if output_type == "cutout":
@@ -82,6 +128,8 @@ def get_clean_subprocess_env():
     # Remove Python-specific variables to avoid conflicts with Krita
     clean_env.pop("PYTHONPATH", None)
     clean_env.pop("PYTHONHOME", None)
+    # The segmentation server relies on cached bytecode for a fast start
+    clean_env.pop("PYTHONDONTWRITEBYTECODE", None)
 
     # Add our custom environment variables
     clean_env.update(SUBPROCESS_ENV_VARS)
@@ -89,13 +137,15 @@ def get_clean_subprocess_env():
     return clean_env
 
 
+@lru_cache(maxsize=None)
 def get_sam2_model_options():
-    """Get list of available SAM2 models for UI dropdown."""
+    """Get available SAM2 models for UI dropdown as (key, display name) pairs."""
     options = []
     for model_key, model_info in SAM2_MODELS.items():
         display_name = f"{model_info['name']}"
         options.append((model_key, display_name))
-    return options
+    # Tuple so the cached result can't be mutated by a caller
+    return tuple(options)
 
 
 def get_sam2_model_key(display_name):
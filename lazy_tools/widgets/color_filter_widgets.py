@@ -1,4 +1,5 @@
-from typing import Dict
+from functools import partial
+from typing import Dict, List, Optional, Set
 from krita import Krita, Node  # type: ignore
 from ..compat import (
     QWidget,
@@ -16,10 +17,20 @@ from ..compat import (
 )
 from lazy_tools.utils.color_scheme import ColorScheme
 from lazy_tools.config.config_loader import get_icon_dir
+from lazy_tools.utils.layer_utils import COLOR_LABEL_LAYER_TYPES
 import os
 
 # from lazy_tools.utils.logs import write_log
 
+# (color label index, name, color) for each row, excluding transparent/none
+_COLOR_ROW_SPEC = [
+    (i, name, ColorScheme.COLORS[i])
+    for i, name in enumerate(
+        ["Blue", "Green", "Yellow", "Orange", "Brown", "Red", "Purple", "Grey"],
+        start=1,
+    )
+]
+
 
 class ColorFilterSection(QWidget):
     """
@@ -30,6 +41,9 @@ class ColorFilterSection(QWidget):
         super().__init__(parent)
         self.parent_docker = parent
         self.color_rows: Dict[int, "ColorFilterRow"] = {}
+        self._pending_toggles: Set[int] = set()
+        self._flush_scheduled = False
+
         self.setup_ui()
 
     def setup_ui(self):
@@ -38,24 +52,11 @@ class ColorFilterSection(QWidget):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(3)
 
-        # Create rows for each color (excluding transparent/none)
-        color_names = [
-            "Blue",
-            "Green",
-            "Yellow",
-            "Orange",
-            "Brown",
-            "Red",
-            "Purple",
-            "Grey",
-        ]
-
         # Create ColorFilterRow widgets
         color_rows_list = []
-        for i, name in enumerate(color_names, start=1):
-            color = ColorScheme.COLORS[i]
-            color_row = ColorFilterRow(i, name, color, self.parent_docker)
-            self.color_rows[i] = color_row
+        for idx, name, color in _COLOR_ROW_SPEC:
+            color_row = ColorFilterRow(idx, name, color, self, self.parent_docker)
+            self.color_rows[idx] = color_row
             color_rows_list.append(color_row)
 
         # First row: 3 columns (Blue, Green, Yellow)
@@ -87,18 +88,108 @@ class ColorFilterSection(QWidget):
 
         self.setLayout(layout)
 
+    def get_color_label_index(self, doc) -> Dict[int, List[Node]]:
+        """Group the layers of doc that have a color label by that label.
+
+        Krita sends no signal when layers are added, removed or relabelled,
+        so the tree is walked again for every action rather than cached.
+        """
+        index: Dict[int, List[Node]] = {}
+        # Explicit stack instead of recursion; children are pushed reversed so
+        # each label's list stays in top-down layer order
+        stack = list(reversed(doc.rootNode().childNodes()))
+        while stack:
+            node = stack.pop()
+            layer_color = node.colorLabel()
+            if layer_color:
+                index.setdefault(layer_color, []).append(node)
+            stack.extend(reversed(node.childNodes()))
+        return index
+
+    def queue_toggle(self, color_index: int):
+        """Queue a color toggle so rapid clicks share a single tree walk."""
+        # Toggling the same color twice before the flush cancels out
+        self._pending_toggles ^= {color_index}
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            QTimer.singleShot(0, self._flush_toggles)
+
+    def _flush_toggles(self):
+        """Toggle visibility of all layers whose color label is pending."""
+        self._flush_scheduled = False
+        pending = self._pending_toggles
+        self._pending_toggles = set()
+        if not pending:
+            return
+
+        try:
+            doc = Krita.instance().activeDocument()
+            if doc:
+                index = self.get_color_label_index(doc)
+                matches = [
+                    node
+                    for color in pending
+                    for node in index.get(color, ())
+                    if node.type() in COLOR_LABEL_LAYER_TYPES
+                ]
+
+                if len(matches) == 1:
+                    # Single layer: keep the built-in action behaviour
+                    self._toggle_node_visibility(matches[0])
+                else:
+                    # Batch toggle: set visibility directly to avoid one
+                    # action dispatch (undo entry, view refresh) per layer
+                    for node in matches:
+                        node.setVisible(not node.visible())
+
+                doc.refreshProjection()
+        except Exception as e:
+            print(f"Error toggling visibility for colors {sorted(pending)}: {e}")
+
+    def _toggle_node_visibility(self, node: Node):
+        """Toggle node visibility using Krita's built-in action."""
+        try:
+            window = Krita.instance().activeWindow()
+            if not window:
+                return
+
+            view = window.activeView()
+            if not view:
+                return
+
+            # Select the target node first
+            view.setCurrentNode(node)
+
+            # Use Krita's built-in toggle display selection action
+            window.action("toggle_display_selection").trigger()
+
+        except Exception as e:
+            print(f"Error toggling node visibility: {e}")
+            # Fallback to manual visibility toggle
+            current_visibility = node.visible()
+            node.setVisible(not current_visibility)
+
 
 class ColorFilterRow(QWidget):
     """
     A row widget containing color icon, toggle button, and opacity buttons for a specific color.
     """
 
-    def __init__(self, color_index: int, color_name: str, color: QColor, parent=None):
+    def __init__(
+        self,
+        color_index: int,
+        color_name: str,
+        color: QColor,
+        section: ColorFilterSection,
+        parent=None,
+    ):
         super().__init__(parent)
         self.color_index = color_index
         self.color_name = color_name
         self.color = color
         self.parent_docker = parent
+        self.section = section
+        self.opacity_popup: Optional["OpacityPopup"] = None
 
         self.setup_ui()
 
@@ -142,14 +233,7 @@ class ColorFilterRow(QWidget):
 
     def toggle_visibility(self):
         """Toggle visibility of all layers with this color label."""
-        try:
-            doc = Krita.instance().activeDocument()
-            if doc:
-                root_node = doc.rootNode()
-                self._toggle_layers_recursive(root_node)
-                doc.refreshProjection()
-        except Exception as e:
-            print(f"Error toggling visibility for {self.color_name}: {e}")
+        self.section.queue_toggle(self.color_index)
 
     def on_label_clicked(self, event):
         """Handle clicks on the label: Shift+click shows opacity popup, Ctrl+right click removes."""
@@ -158,7 +242,12 @@ class ColorFilterRow(QWidget):
             if event.modifiers() & Qt.ShiftModifier:
                 # Show opacity popup at cursor position
                 cursor_pos = QCursor.pos()
-                self.opacity_popup = OpacityPopup(self, cursor_pos)
+                if self.opacity_popup is None:
+                    self.opacity_popup = OpacityPopup(self, cursor_pos)
+                else:
+                    # Reuse the popup built on the first Shift+click
+                    self.opacity_popup.move(cursor_pos)
+                    self.opacity_popup.close_timer.start(3000)
                 self.opacity_popup.show()
         except Exception as e:
             print(f"Error handling label click: {e}")
@@ -168,85 +257,19 @@ class ColorFilterRow(QWidget):
         try:
             doc = Krita.instance().activeDocument()
             if doc:
-                root_node = doc.rootNode()
                 # Convert percentage to 0-255 range
                 opacity_value = int((opacity_percent / 100.0) * 255)
-                self._set_layers_opacity_recursive(root_node, opacity_value)
+                index = self.section.get_color_label_index(doc)
+                for node in index.get(self.color_index, ()):
+                    try:
+                        node.setOpacity(opacity_value)
+                    except Exception as e:
+                        print(f"Error setting opacity for {node.name()}: {e}")
                 doc.refreshProjection()
                 print(f"Set {self.color_name} layers opacity to {opacity_percent}%")
         except Exception as e:
             print(f"Error setting opacity for {self.color_name}: {e}")
 
-    def _toggle_layers_recursive(self, node: Node):
-        """Recursively toggle visibility of layers with the target color label."""
-        if not node:
-            return
-
-        # Don't process the root node
-        if node.type() == "grouplayer" and node.parentNode() is None:
-            for child in node.childNodes():
-                self._toggle_layers_recursive(child)
-            return
-
-        # Check if this layer has the target color label
-        if node.type() in ["paintlayer", "grouplayer", "vectorlayer", "filterlayer"]:
-            layer_color = node.colorLabel()
-
-            if layer_color == self.color_index:
-                # Toggle visibility using Krita's built-in action
-                self._toggle_node_visibility(node)
-
-        # Process child nodes
-        for child in node.childNodes():
-            self._toggle_layers_recursive(child)
-
-    def _set_layers_opacity_recursive(self, node: Node, opacity_value: int):
-        """Recursively set opacity of layers with the target color label."""
-        if not node:
-            return
-
-        # Don't process the root node
-        if node.type() == "grouplayer" and node.parentNode() is None:
-            for child in node.childNodes():
-                self._set_layers_opacity_recursive(child, opacity_value)
-            return
-
-        # Check if this layer has the target color label
-        try:
-            layer_color = node.colorLabel()
-
-            if layer_color == self.color_index:
-                node.setOpacity(opacity_value)
-        except Exception as e:
-            print(f"Error setting opacity for {node.name()}: {e}")
-
-        # Process child nodes
-        for child in node.childNodes():
-            self._set_layers_opacity_recursive(child, opacity_value)
-
-    def _toggle_node_visibility(self, node: Node):
-        """Toggle node visibility using Krita's built-in action."""
-        try:
-            window = Krita.instance().activeWindow()
-            if not window:
-                return
-
-            view = window.activeView()
-            if not view:
-                return
-
-            # Select the target node first
-            view.setCurrentNode(node)
-
-            # Use Krita's built-in toggle display selection action
-            window.action("toggle_display_selection").trigger()
-
-        except Exception as e:
-            print(f"Error toggling node visibility: {e}")
-            # Fallback to manual visibility toggle
-            current_visibility = node.visible()
-            node.setVisible(not current_visibility)
-
 
 class OpacityPopup(QWidget):
     """Popup window that shows opacity buttons and auto-closes after 3 seconds."""
@@ -255,7 +278,6 @@ class OpacityPopup(QWidget):
         super().__init__(None)  # No parent to make it a top-level window
         self.parent_row = parent_row
         self.setWindowFlags(Qt.Popup | Qt.FramelessWindowHint)
-        self.setAttribute(Qt.WA_DeleteOnClose)
 
         # Setup UI
         layout = QHBoxLayout()
@@ -267,7 +289,7 @@ class OpacityPopup(QWidget):
         for opacity in opacity_values:
             btn = QPushButton(str(opacity))
             btn.setFixedSize(40, 30)
-            btn.clicked.connect(lambda checked, op=opacity: self.on_opacity_clicked(op))
+            btn.clicked.connect(partial(self.on_opacity_clicked, opacity))
             layout.addWidget(btn)
 
         self.setLayout(layout)
@@ -304,7 +326,7 @@ class OpacityPopup(QWidget):
         self.close_timer.setSingleShot(True)
         self.close_timer.start(3000)  # 3000 ms = 3 seconds
 
-    def on_opacity_clicked(self, opacity):
+    def on_opacity_clicked(self, opacity, checked=False):
         """Handle opacity button click."""
         self.parent_row.set_opacity(opacity)
         self.close()
@@ -1,4 +1,7 @@
-from typing import Dict
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
 from krita import *  # type: ignore
 from ..compat import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QLineEdit,
@@ -8,16 +11,70 @@ from lazy_tools.utils.color_scheme import ColorScheme
 
 # from lazy_tools.utils.logs import write_log
 
+# Fallback poll for edits Krita sends no signal for (renames, new layers)
+_FALLBACK_REFRESH_MS = 5000
+
+# Set once on NameFilterSection; rows pick it up through their object names
+# instead of each parsing their own style sheet
+_SECTION_QSS = """
+    QLabel#nfFilterLabel {
+        font-size: 14px;
+        font-weight: bold;
+        color: #a3a3a3;
+        background-color: #191919;
+    }
+    QLabel#nfLabel {
+        font-size: 16px;
+        font-weight: bold;
+        color: #a3a3a3;
+        background-color: #191919;
+    }
+    QLabel#nfCountLabel {
+        font-size: 14px;
+        font-weight: bold;
+        color: #6c7fd7;
+        background-color: #000000;
+    }
+    QPushButton#nfToggle {
+        background-color: #191919;
+    }
+    QPushButton#nfToggle:hover {
+        background-color: #393939;
+    }
+"""
+
 
 class NameFilterSection(QWidget):
 
+    # Rows are rebuilt at most once per this interval; faster requests are
+    # coalesced into one trailing rebuild
+    _min_redraw_interval_ms = 100
+
     def __init__(self, parent=None, use_prefix_match=True, default_filter="_"):
         super().__init__(parent)
         self.parent_docker = parent
-        self.name_rows: Dict[int, "NameFilterRow"] = {}
+        self.name_rows: Dict[str, "NameFilterRow"] = {}
+        # Hidden rows kept for reuse so filter edits don't churn widgets
+        self._row_pool: List["NameFilterRow"] = []
         self.use_prefix_match = use_prefix_match
         self.default_filter = default_filter
         self.total_node_count = 0
+        self._last_fingerprint: Optional[Tuple[int, int]] = None
+
+        # Every (node, name) in the document, valid until the counter is
+        # bumped; filter edits re-filter this list without calling Krita
+        self._doc_dirty_counter = 0
+        self._node_cache: List[Tuple[Node, str]] = []
+        self._node_cache_key = None
+        # Same nodes grouped by name, shared by every row so row actions
+        # don't walk the tree, plus the names in code-point order so a
+        # prefix filter is a bisection instead of a scan
+        self.name_index: Dict[str, List[Node]] = {}
+        self._sorted_names: List[str] = []
+
+        # Last generate_target_list result
+        self._cache: Optional[List[Tuple[Node, str]]] = None
+        self._cache_key = None
 
         # Main layout
         main_layout = QVBoxLayout()
@@ -29,12 +86,7 @@ class NameFilterSection(QWidget):
         filter_row.setSpacing(5)
 
         filter_label = QLabel("Filter:")
-        filter_label.setStyleSheet(
-            "font-size: 14px; "
-            "font-weight: bold;"
-            "color: #a3a3a3; "
-            "background-color: #191919;"
-        )
+        filter_label.setObjectName("nfFilterLabel")
         filter_label.setFixedWidth(60)
         filter_row.addWidget(filter_label)
 
@@ -42,6 +94,7 @@ class NameFilterSection(QWidget):
         self.filter_input = QLineEdit()
         self.filter_input.setText(self.default_filter)
         self.filter_input.textChanged.connect(self.on_filter_changed)
+        self.filter_input.editingFinished.connect(self.on_filter_committed)
         filter_row.addWidget(self.filter_input)
 
         main_layout.addLayout(filter_row)
@@ -54,110 +107,326 @@ class NameFilterSection(QWidget):
 
         self.setLayout(main_layout)
 
-        # Setup timer to update UI every 1 second
+        # Style the whole subtree once instead of per widget
+        self.setStyleSheet(_SECTION_QSS)
+
+        # Debounce filter edits so only the last keystroke triggers a refresh
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(250)
+        self._debounce.timeout.connect(
+            lambda: self.update_ui(self.filter_input.text())
+        )
+
+        # Rate limiter for update_ui
+        self._pending_pattern = self.default_filter
+        self._last_redraw = 0.0
+        self._redraw_timer = QTimer(self)
+        self._redraw_timer.setSingleShot(True)
+        self._redraw_timer.timeout.connect(self._flush_redraw)
+
+        # Refresh when documents/views change instead of polling every second
+        self._active_window = None
+        notifier = Krita.instance().notifier()
+        notifier.imageCreated.connect(self.schedule_refresh)
+        notifier.imageClosed.connect(self.schedule_refresh)
+        notifier.viewCreated.connect(self.schedule_refresh)
+        notifier.viewClosed.connect(self.schedule_refresh)
+        notifier.windowCreated.connect(self._connect_active_window)
+
+        # Slow safety-net timer for changes that emit no signal
         self.update_timer = QTimer(self)
+        # Exact timing doesn't matter here; let the OS batch wakeups
+        self.update_timer.setTimerType(Qt.CoarseTimer)
         self.update_timer.timeout.connect(self.on_timer_update)
-        self.update_timer.start(1000)  # 1000 ms = 1 second
+        self.update_timer.start(_FALLBACK_REFRESH_MS)
 
         # Initial UI setup
         self.update_ui(self.filter_input.text())
 
     def on_filter_changed(self):
         """Called when the filter text input changes."""
-        self.update_ui(self.filter_input.text())
+        # Restart the countdown on every keystroke
+        self._debounce.start()
+
+    def on_filter_committed(self):
+        """Apply the filter at once on Enter/focus-out instead of waiting."""
+        if self._debounce.isActive():
+            self._debounce.stop()
+            self.update_ui(self.filter_input.text())
 
     def on_timer_update(self):
-        """Called by the timer every second."""
+        """Called by the fallback timer."""
+        # A hidden parent docker doesn't always reach this widget's hideEvent
+        if not self.isVisible():
+            return
+        self.invalidate()
         self.update_ui(self.filter_input.text())
 
+    def invalidate(self, *args):
+        """Mark cached traversal results as stale."""
+        self._doc_dirty_counter += 1
+
+    def _connect_active_window(self):
+        """Refresh when the user switches to another document view."""
+        window = Krita.instance().activeWindow()
+        if window:
+            # Keep a reference so the wrapper (and its connection) stays alive
+            self._active_window = window
+            window.activeViewChanged.connect(self.schedule_refresh)
+
+    def schedule_refresh(self, *args):
+        """Coalesce change notifications into one refresh."""
+        self.invalidate()
+        self._debounce.start()
+
     def update_ui(self, filter_pattern):
+        """Update the UI, coalescing calls that arrive faster than the redraw rate."""
+        self._pending_pattern = filter_pattern
+        # Nothing to show while hidden; showEvent catches up
+        if not self.isVisible():
+            return
+        if self._redraw_timer.isActive():
+            return
+        elapsed_ms = (time.monotonic() - self._last_redraw) * 1000
+        if elapsed_ms >= self._min_redraw_interval_ms:
+            self._flush_redraw()
+        else:
+            self._redraw_timer.start(int(self._min_redraw_interval_ms - elapsed_ms))
+
+    def _flush_redraw(self):
+        """Rebuild the rows for the latest requested filter."""
+        # The trailing timer can still fire after the section was hidden
+        if not self.isVisible():
+            return
+        self._last_redraw = time.monotonic()
+        self._rebuild_rows(self._pending_pattern)
+
+    def _rebuild_rows(self, filter_pattern):
         """Update the UI by checking current nodes and refreshing the list."""
-        # Get current node list
-        current_nodes = self.generate_target_list(filter_pattern)
+        # Get current (node, name) list
+        named = self.generate_target_list(filter_pattern)
 
-        # Count nodes by name
-        name_counts = {}
-        for node in current_nodes:
-            node_name = node.name()
+        # Count nodes by name; the dict's keys double as the de-duplicated
+        # name list
+        name_counts: Dict[str, int] = {}
+        for _, node_name in named:
             name_counts[node_name] = name_counts.get(node_name, 0) + 1
 
-        # Remove duplicates: keep only unique node names
-        seen_names = set()
-        unique_nodes = []
-        for node in current_nodes:
-            node_name = node.name()
-            if node_name not in seen_names:
-                seen_names.add(node_name)
-                unique_nodes.append(node)
-
-        unique_nodes = sorted(unique_nodes, key=lambda node: node.name().lower())
-
-        # Get current unique node names and existing node names as sorted lists
-        current_node_names = sorted([node.name() for node in unique_nodes])
-        existing_node_names = sorted([row.node_name for row in self.name_rows.values()])
-
-        # If the node list hasn't changed, skip update
-        if (
-            current_node_names == existing_node_names
-            and len(current_nodes) == self.total_node_count
-        ):
+        # If the (name, count) multiset hasn't changed, skip the sort and
+        # rebuild. Hashing the items keeps duplicate names distinct, which
+        # an XOR fold of the names would not
+        fingerprint = (hash(frozenset(name_counts.items())), len(named))
+        if fingerprint == self._last_fingerprint:
             return
 
-        # Clear existing widgets
-        for i in list(self.name_rows.keys()):
-            widget = self.name_rows[i]
-            self.node_rows_layout.removeWidget(widget)
-            widget.deleteLater()
-        self.name_rows.clear()
+        # Break case-insensitive ties on the exact name so the order is total:
+        # kept rows then never need moving, only new rows need inserting
+        unique_names = sorted(name_counts, key=lambda name: (name.casefold(), name))
 
-        # Add new widgets
-        for i, node in enumerate(unique_nodes, start=0):
-            node_name = node.name()
-            count = name_counts.get(node_name, 1)
-            name_row = NameFilterRow(node_name, self.parent_docker, node_count=count)
-            self.name_rows[i] = name_row
-            self.node_rows_layout.addWidget(name_row)
+        # Diff against the existing rows instead of rebuilding all of them
+        new_names = set(name_counts)
+        old_names = set(self.name_rows)
 
-        self.total_node_count = len(current_nodes)
-
-    def generate_target_list(self, filter_pattern="_"):
-        targetNodes = []
-        doc = Krita.instance().activeDocument()
+        for node_name in old_names - new_names:
+            widget = self.name_rows.pop(node_name)
+            widget.hide()
+            self.node_rows_layout.removeWidget(widget)
+            self._row_pool.append(widget)
+
+        # Rows stay sorted, so inserting in sorted order lands each new row
+        # at its final position
+        for position, node_name in enumerate(unique_names):
+            count = name_counts[node_name]
+            name_row = self.name_rows.get(node_name)
+            if name_row is None:
+                if self._row_pool:
+                    name_row = self._row_pool.pop()
+                    name_row.rebind(node_name, count)
+                else:
+                    name_row = NameFilterRow(
+                        node_name, self, self.parent_docker, node_count=count
+                    )
+                self.name_rows[node_name] = name_row
+                self.node_rows_layout.insertWidget(position, name_row)
+                name_row.show()
+            elif name_row.node_count != count:
+                name_row.set_node_count(count)
+
+        self.total_node_count = len(named)
+        self._last_fingerprint = fingerprint
+
+    def generate_target_list(
+        self, filter_pattern="_", doc=None
+    ) -> List[Tuple[Node, str]]:
+        """Return (node, name) pairs whose name matches filter_pattern."""
+        if not filter_pattern:
+            return []
+        if doc is None:
+            doc = Krita.instance().activeDocument()
         if not doc:
-            return targetNodes
-        root = doc.rootNode()
-        for node in self.get_all_nodes(root):
-            node_name = node.name()
-            if self.use_prefix_match:
-                # Prefix match: node name starts with the filter pattern
-                if node_name.startswith(filter_pattern) and filter_pattern != "":
-                    targetNodes.append(node)
-            else:
-                # Any match: filter pattern appears anywhere in node name
-                if filter_pattern in node_name and filter_pattern != "":
-                    targetNodes.append(node)
-        return targetNodes
+            return []
+
+        # Keyed on the document itself rather than id(doc): wrappers are
+        # recreated on every call, so their ids can be reused
+        key = (doc, self._doc_dirty_counter, filter_pattern, self.use_prefix_match)
+        if key == self._cache_key:
+            return self._cache
+
+        all_nodes = self.document_nodes(doc)
+        if self.use_prefix_match:
+            # Prefix match: node name starts with the filter pattern. Matching
+            # names are contiguous in sorted order, so the cost follows the
+            # number of hits rather than the size of the document
+            names = self._sorted_names
+            target_nodes = []
+            for i in range(bisect_left(names, filter_pattern), len(names)):
+                node_name = names[i]
+                if not node_name.startswith(filter_pattern):
+                    break
+                target_nodes.extend(
+                    (node, node_name) for node in self.name_index[node_name]
+                )
+        else:
+            # Any match: filter pattern appears anywhere in node name
+            target_nodes = [
+                (node, node_name)
+                for node, node_name in all_nodes
+                if filter_pattern in node_name
+            ]
+
+        self._cache_key = key
+        self._cache = target_nodes
+        return target_nodes
+
+    def document_nodes(self, doc) -> List[Tuple[Node, str]]:
+        """Return (node, name) for every node of doc except the root."""
+        key = (doc, self._doc_dirty_counter)
+        if key != self._node_cache_key:
+            nodes = self.get_all_nodes(doc.rootNode())
+            # Skip the root node itself; row actions never apply to it
+            next(nodes)
+            self._node_cache = [(node, node.name()) for node in nodes]
+            self._node_cache_key = key
+
+            nodes_by_name = defaultdict(list)
+            for node, node_name in self._node_cache:
+                nodes_by_name[node_name].append(node)
+            self.name_index = dict(nodes_by_name)
+            self._sorted_names = sorted(nodes_by_name)
+        return self._node_cache
+
+    def nodes_named(self, node_name: str, doc=None) -> List[Node]:
+        """Return every node called node_name, in layer-tree order."""
+        if doc is None:
+            doc = Krita.instance().activeDocument()
+        if not doc:
+            return []
+        # Revalidates the index against the document. It covers every name,
+        # not just the current filter's matches, so a row clicked while a
+        # filter edit is still debouncing still finds its layers
+        self.document_nodes(doc)
+        nodes = self.name_index.get(node_name, [])
+
+        # Renames and deletions send no signal, so check the cached nodes and
+        # walk the tree again if any of them no longer match
+        current = [
+            node
+            for node in nodes
+            if node.parentNode() is not None and node.name() == node_name
+        ]
+        if len(current) != len(nodes):
+            self.invalidate()
+            self.document_nodes(doc)
+            current = self.name_index.get(node_name, [])
+        return current
 
     def get_all_nodes(self, node):
-        nodes = [node]
-        for child in node.childNodes():
-            nodes.extend(self.get_all_nodes(child))
-        return nodes
+        """Yield node and all of its descendants, depth-first.
+
+        Must run on the GUI thread: Krita's Node wrappers call into the
+        image without locking, so the walk is kept cheap (cached, debounced,
+        paused while hidden) rather than moved to a worker thread.
+        """
+        # Children are pushed reversed so nodes come out in the same order
+        # as a recursive walk, which keeps name_index's "first" node stable
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            yield current
+            stack.extend(reversed(current.childNodes()))
+
+    def hideEvent(self, event):
+        """Stop polling while the section is collapsed or the docker is hidden."""
+        self.update_timer.stop()
+        super().hideEvent(event)
+
+    def showEvent(self, event):
+        """Resume polling and catch up on changes made while hidden."""
+        self.update_timer.start(_FALLBACK_REFRESH_MS)
+        self.invalidate()
+        self.update_ui(self.filter_input.text())
+        super().showEvent(event)
+
+    def enterEvent(self, event):
+        """Pick up layer edits made elsewhere before the user interacts."""
+        self.schedule_refresh()
+        super().enterEvent(event)
 
     def closeEvent(self, event):
-        """Stop the timer when widget is closed."""
+        """Stop the timers and drop connections when widget is closed."""
         if hasattr(self, "update_timer"):
             self.update_timer.stop()
+            self._debounce.stop()
+            self._redraw_timer.stop()
+
+        # Disconnect so no queued callback reaches a half-destroyed widget
+        try:
+            self.update_timer.timeout.disconnect()
+            self._debounce.timeout.disconnect()
+            self._redraw_timer.timeout.disconnect()
+            self.filter_input.textChanged.disconnect()
+            self.filter_input.editingFinished.disconnect()
+            notifier = Krita.instance().notifier()
+            notifier.imageCreated.disconnect(self.schedule_refresh)
+            notifier.imageClosed.disconnect(self.schedule_refresh)
+            notifier.viewCreated.disconnect(self.schedule_refresh)
+            notifier.viewClosed.disconnect(self.schedule_refresh)
+            notifier.windowCreated.disconnect(self._connect_active_window)
+            if self._active_window:
+                self._active_window.activeViewChanged.disconnect(
+                    self.schedule_refresh
+                )
+        except (TypeError, RuntimeError) as e:
+            print(f"Error disconnecting name filter signals: {e}")
+        self._active_window = None
+
+        # Rows are owned by Qt; drop the Python-side references
+        self.name_rows.clear()
+        self._row_pool.clear()
+        self.name_index = {}
+        self._node_cache = []
+        self._node_cache_key = None
+        self._sorted_names = []
+        self._cache = None
+        self._cache_key = None
         super().closeEvent(event)
 
 
 class NameFilterRow(QWidget):
 
-    def __init__(self, node_name: str, parent=None, node_count: int = 0):
+    def __init__(
+        self,
+        node_name: str,
+        section: NameFilterSection,
+        parent=None,
+        node_count: int = 0,
+    ):
         super().__init__(parent)
         self.node_name = node_name
         self.parent_docker = parent
         self.node_count = node_count
+        self.section = section
 
         self.setup_ui()
 
@@ -171,40 +440,21 @@ class NameFilterRow(QWidget):
         self.toggle_button = QPushButton("👁")
         self.toggle_button.setFixedSize(30, 25)
         self.toggle_button.clicked.connect(self.toggle_visibility)
-        self.toggle_button.setStyleSheet(
-            """
-            QPushButton {
-                background-color: #191919;
-            }
-            QPushButton:hover {
-                background-color: #393939;
-            }
-        """
-        )
+        self.toggle_button.setObjectName("nfToggle")
         main_layout.addWidget(self.toggle_button)
 
         # node name label
         self.node_name_label = QLabel(self.node_name)
         self.node_name_label.setMaximumWidth(300)
         self.node_name_label.setFixedHeight(30)
-        self.node_name_label.setStyleSheet(
-            "font-size: 16px; "
-            "font-weight: bold;"
-            "color: #a3a3a3; "
-            "background-color: #191919;"
-        )
+        self.node_name_label.setObjectName("nfLabel")
         # Make label clickable
         self.node_name_label.mousePressEvent = self.on_label_clicked
         main_layout.addWidget(self.node_name_label)
 
         # display the node number of layers with this name
         self.node_count_label = QLabel(str(self.node_count))
-        self.node_count_label.setStyleSheet(
-            "font-size: 14px; "
-            "font-weight: bold;"
-            "color: #6c7fd7; "
-            "background-color: #000000;"
-        )
+        self.node_count_label.setObjectName("nfCountLabel")
         main_layout.addWidget(self.node_count_label)
 
         # Add stretch to push everything to the left
@@ -212,6 +462,17 @@ class NameFilterRow(QWidget):
 
         self.setLayout(main_layout)
 
+    def rebind(self, node_name: str, node_count: int):
+        """Reuse this row for another layer name."""
+        self.node_name = node_name
+        self.node_name_label.setText(node_name)
+        self.set_node_count(node_count)
+
+    def set_node_count(self, node_count: int):
+        """Update the number of layers shown for this name."""
+        self.node_count = node_count
+        self.node_count_label.setText(str(node_count))
+
     def on_label_clicked(self, event):
         """Handle clicks on the label: Shift+click shows opacity popup, Ctrl+right click removes."""
         try:
@@ -242,8 +503,8 @@ class NameFilterRow(QWidget):
                 return
 
             # Find the first node with this name
-            root_node = doc.rootNode()
-            target_node = self._find_first_node_by_name(root_node, self.node_name)
+            matches = self.section.nodes_named(self.node_name, doc)
+            target_node = matches[0] if matches else None
 
             if target_node:
                 # Set this node as the active/current node
@@ -262,15 +523,19 @@ class NameFilterRow(QWidget):
             if not doc:
                 return
 
-            # Find the first node with this name
-            root_node = doc.rootNode()
-            target_node = self._find_first_node_by_name(root_node, self.node_name)
+            # Find the first node with this name. Deleting can't be undone
+            # from here, so look it up on a fresh walk rather than the cache
+            self.section.invalidate()
+            matches = self.section.nodes_named(self.node_name, doc)
+            target_node = matches[0] if matches else None
 
-            if target_node:
+            if target_node and target_node.name() == self.node_name:
                 # Remove the node
                 parent = target_node.parentNode()
                 if parent:
                     parent.removeChildNode(target_node)
+                    # Update the row list (and counts) right away
+                    self.section.schedule_refresh()
                     doc.refreshProjection()
                     print(f"Removed node: {self.node_name}")
                 else:
@@ -281,109 +546,48 @@ class NameFilterRow(QWidget):
         except Exception as e:
             print(f"Error removing node {self.node_name}: {e}")
 
-    def _find_first_node_by_name(self, node: Node, target_name: str):
-        """Recursively find the first node with the target name."""
-        if not node:
-            return None
-
-        # Don't check the root node
-        if node.type() == "grouplayer" and node.parentNode() is None:
-            for child in node.childNodes():
-                result = self._find_first_node_by_name(child, target_name)
-                if result:
-                    return result
-            return None
-
-        # Check if this node matches
-        if node.name() == target_name:
-            return node
-
-        # Check child nodes
-        for child in node.childNodes():
-            result = self._find_first_node_by_name(child, target_name)
-            if result:
-                return result
-
-        return None
-
     def toggle_visibility(self):
-        """Toggle visibility of all layers with this color label."""
+        """Toggle visibility of all layers with this name."""
         try:
-            doc = Krita.instance().activeDocument()
+            krita = Krita.instance()
+            doc = krita.activeDocument()
             if doc:
-                root_node = doc.rootNode()
-                self._toggle_layers_recursive(root_node)
+                matches = self.section.nodes_named(self.node_name, doc)
+                if len(matches) == 1:
+                    # Single layer: keep the built-in action behaviour
+                    window = krita.activeWindow()
+                    view = window.activeView() if window else None
+                    if view:
+                        self._toggle_node_visibility(matches[0], window, view)
+                else:
+                    # Batch toggle: set visibility directly to avoid one
+                    # action dispatch (undo entry, view refresh) per layer
+                    for node in matches:
+                        node.setVisible(not node.visible())
                 doc.refreshProjection()
         except Exception as e:
             print(f"Error toggling visibility for {self.node_name}: {e}")
 
     def set_opacity(self, opacity_percent: int):
-        """Set opacity of all layers with this color label."""
+        """Set opacity of all layers with this name."""
         try:
             doc = Krita.instance().activeDocument()
             if doc:
-                root_node = doc.rootNode()
                 # Convert percentage to 0-255 range
                 opacity_value = int((opacity_percent / 100.0) * 255)
-                self._set_layers_opacity_recursive(root_node, opacity_value)
+                for node in self.section.nodes_named(self.node_name, doc):
+                    try:
+                        node.setOpacity(opacity_value)
+                    except Exception as e:
+                        print(f"Error setting opacity for {node.name()}: {e}")
                 doc.refreshProjection()
                 print(f"Set {self.node_name} layers opacity to {opacity_percent}%")
         except Exception as e:
             print(f"Error setting opacity for {self.node_name}: {e}")
 
-    def _toggle_layers_recursive(self, node: Node):
-        """Recursively toggle visibility of layers with the target color label."""
-        if not node:
-            return
-
-        # Don't process the root node
-        if node.type() == "grouplayer" and node.parentNode() is None:
-            for child in node.childNodes():
-                self._toggle_layers_recursive(child)
-            return
-
-        # Check if the node's name match the target
-        if node.name() == self.node_name:
-            # Toggle visibility using Krita's built-in action
-            self._toggle_node_visibility(node)
-
-        # Process child nodes
-        for child in node.childNodes():
-            self._toggle_layers_recursive(child)
-
-    def _set_layers_opacity_recursive(self, node: Node, opacity_value: int):
-        """Recursively set opacity of layers with the target color label."""
-        if not node:
-            return
-
-        # Don't process the root node
-        if node.type() == "grouplayer" and node.parentNode() is None:
-            for child in node.childNodes():
-                self._set_layers_opacity_recursive(child, opacity_value)
-            return
-
-        # Check if this layer has the target name and type is correct
-        if node.name() == self.node_name:
-            try:
-                # Set opacity
-                node.setOpacity(opacity_value)
-            except Exception as e:
-                print(f"Error setting opacity for {node.name()}: {e}")
-
-        # Process child nodes
-        for child in node.childNodes():
-            self._set_layers_opacity_recursive(child, opacity_value)
-
-    def _toggle_node_visibility(self, node: Node):
+    def _toggle_node_visibility(self, node: Node, window, view):
+        """Toggle node visibility in view using Krita's built-in action."""
         try:
-            window = Krita.instance().activeWindow()
-            if not window:
-                return
-
-            view = window.activeView()
-            if not view:
-                return
-
             # Select the target node first
             view.setCurrentNode(node)
 
@@ -416,7 +620,9 @@ class OpacityPopup(QWidget):
         for opacity in opacity_values:
             btn = QPushButton(str(opacity))
             btn.setFixedSize(40, 30)
-            btn.clicked.connect(lambda checked, op=opacity: self.on_opacity_clicked(op))
+            # One shared slot; the value travels on the button itself
+            btn.setProperty("opacity", opacity)
+            btn.clicked.connect(self.on_opacity_clicked)
             layout.addWidget(btn)
 
         self.setLayout(layout)
@@ -455,7 +661,7 @@ class OpacityPopup(QWidget):
         self.close_timer.setSingleShot(True)
         self.close_timer.start(3000)  # 3000 ms = 3 seconds
 
-    def on_opacity_clicked(self, opacity):
+    def on_opacity_clicked(self):
         """Handle opacity button click."""
-        self.parent_row.set_opacity(opacity)
+        self.parent_row.set_opacity(self.sender().property("opacity"))
         self.close()
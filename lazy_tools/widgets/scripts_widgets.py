@@ -5,7 +5,9 @@ This module contains widgets for executing custom Python scripts.
 """
 
 import os
-from typing import List
+from functools import partial
+from types import CodeType
+from typing import Dict, List, Optional, Tuple
 from krita import Krita  # type: ignore
 from ..compat import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QScrollArea,
@@ -13,6 +15,29 @@ from ..compat import (
 )
 from lazy_tools.utils.color_scheme import ColorScheme
 
+# Set once on the scripts container instead of on every button
+_SCRIPTS_CONTAINER_QSS = """
+    QPushButton#scriptButton {
+        text-align: left;
+        padding: 1px 1px;
+        color: #a3a3a3;
+        background-color: #191919;
+    }
+    QPushButton#scriptButton:hover {
+        color: #a3a3a3;
+        background-color: #333333;
+    }
+    QPushButton#scriptButton:pressed {
+        color: #a3a3a3;
+        background-color: #555555;
+    }
+    QLabel#noScriptsLabel {
+        color: #7065a7;
+        font-style: italic;
+        padding: 10px;
+    }
+"""
+
 
 class ScriptsSection(QWidget):
     """
@@ -25,18 +50,20 @@ class ScriptsSection(QWidget):
         self.scripts_folder = os.path.join(
             os.path.dirname(os.path.dirname(__file__)), "scripts"
         )
+        # (folder st_mtime_ns, sorted script names) from the last scan
+        self._scripts_cache: Optional[Tuple[int, List[str]]] = None
+        # script path -> (file st_mtime_ns, compiled code)
+        self._code_cache: Dict[str, Tuple[int, CodeType]] = {}
+        # Set when a refresh was skipped while hidden
+        self._dirty = True
         self._ensure_scripts_folder_exists()
         self.setup_ui()
 
     def _ensure_scripts_folder_exists(self):
         """Create the scripts folder if it doesn't exist."""
         try:
-            if not os.path.exists(self.scripts_folder):
-                os.makedirs(self.scripts_folder)
-                print(f"Created scripts folder: {self.scripts_folder}")
-            else:
-                print(f"Scripts folder exists: {self.scripts_folder}")
-        except Exception as e:
+            os.makedirs(self.scripts_folder, exist_ok=True)
+        except OSError as e:
             print(f"Error creating scripts folder: {e}")
 
     def setup_ui(self):
@@ -79,6 +106,7 @@ class ScriptsSection(QWidget):
         self.scripts_layout.setContentsMargins(2, 2, 2, 2)
         self.scripts_layout.setSpacing(2)
         self.scripts_container.setLayout(self.scripts_layout)
+        self.scripts_container.setStyleSheet(_SCRIPTS_CONTAINER_QSS)
 
         layout.addWidget(self.scripts_container)
         layout.addStretch()
@@ -88,6 +116,12 @@ class ScriptsSection(QWidget):
 
     def _populate_script_buttons(self):
         """Create buttons for each available script."""
+        # Defer the rebuild until the section is shown
+        if not self.isVisible():
+            self._dirty = True
+            return
+        self._dirty = False
+
         # Clear existing buttons
         self._clear_script_buttons()
 
@@ -97,38 +131,22 @@ class ScriptsSection(QWidget):
         if not script_files:
             # Show "No scripts found" message
             no_scripts_label = QLabel("No scripts found")
-            no_scripts_label.setStyleSheet(
-                "QLabel { color: #7065a7; font-style: italic; padding: 10px; }"
-            )
+            no_scripts_label.setObjectName("noScriptsLabel")
             no_scripts_label.setAlignment(Qt.AlignCenter)
             self.scripts_layout.addWidget(no_scripts_label)
         else:
+            # Format the button texts up front so the loop only builds widgets
+            button_specs = [
+                (name, f"▶ {name}", f"Execute script: {name}")
+                for name in script_files
+            ]
             # Create button for each script
-            for script_name in script_files:
-                script_btn = QPushButton(f"▶ {script_name}")
-                script_btn.setToolTip(f"Execute script: {script_name}")
-                script_btn.setStyleSheet(
-                    """
-                    QPushButton {
-                        text-align: left;
-                        padding: 1px 1px;
-                        color: #a3a3a3; 
-                        background-color: #191919;
-                    }
-                    QPushButton:hover {
-                        color: #a3a3a3;
-                        background-color: #333333;
-                    }
-                    QPushButton:pressed {
-                        color: #a3a3a3;
-                        background-color: #555555;
-                    }
-                """
-                )
+            for script_name, label, tooltip in button_specs:
+                script_btn = QPushButton(label)
+                script_btn.setToolTip(tooltip)
+                script_btn.setObjectName("scriptButton")
                 # Connect to execution with the script name
-                script_btn.clicked.connect(
-                    lambda checked, name=script_name: self._run_script(name)
-                )
+                script_btn.clicked.connect(partial(self._run_script, script_name))
                 self.scripts_layout.addWidget(script_btn)
 
         # Add stretch to push buttons to top
@@ -145,22 +163,38 @@ class ScriptsSection(QWidget):
         """Get list of Python script files in the scripts folder."""
         script_files = []
 
-        if not os.path.exists(self.scripts_folder):
+        try:
+            folder_mtime = os.stat(self.scripts_folder).st_mtime_ns
+        except OSError:
             print(f"Scripts folder not found: {self.scripts_folder}")
             return script_files
 
+        # Adding, removing or renaming a file bumps the folder's mtime, so an
+        # unchanged mtime means the listing is unchanged
+        if self._scripts_cache and self._scripts_cache[0] == folder_mtime:
+            return list(self._scripts_cache[1])
+
         try:
-            for filename in os.listdir(self.scripts_folder):
-                if filename.endswith(".py") and not filename.startswith("__"):
-                    # Remove .py extension for display
-                    script_name = filename[:-3]
-                    script_files.append(script_name)
+            with os.scandir(self.scripts_folder) as entries:
+                for entry in entries:
+                    filename = entry.name
+                    if (
+                        filename.endswith(".py")
+                        and not filename.startswith("__")
+                        and entry.is_file()
+                    ):
+                        # Remove .py extension for display
+                        script_name = filename[:-3]
+                        script_files.append(script_name)
         except Exception as e:
             print(f"Error reading scripts folder: {e}")
+            return sorted(script_files)
 
-        return sorted(script_files)
+        script_files.sort()
+        self._scripts_cache = (folder_mtime, script_files)
+        return list(script_files)
 
-    def _run_script(self, script_name: str):
+    def _run_script(self, script_name: str, checked: bool = False):
         """Run a script by name."""
         try:
             script_filename = script_name + ".py"
@@ -179,9 +213,16 @@ class ScriptsSection(QWidget):
     def _run_script_file(self, script_path: str, script_name: str):
         """Run a Python script file."""
         try:
-            # Read and execute the script content
-            with open(script_path, "r", encoding="utf-8") as f:
-                script_content = f.read()
+            # Reuse the compiled code until the file is modified
+            script_mtime = os.stat(script_path).st_mtime_ns
+            cached = self._code_cache.get(script_path)
+            if cached and cached[0] == script_mtime:
+                script_code = cached[1]
+            else:
+                with open(script_path, "r", encoding="utf-8") as f:
+                    script_content = f.read()
+                script_code = compile(script_content, script_path, "exec")
+                self._code_cache[script_path] = (script_mtime, script_code)
 
             # Create a namespace for the script execution
             script_globals = {
@@ -191,12 +232,18 @@ class ScriptsSection(QWidget):
             }
 
             # Execute the script
-            exec(script_content, script_globals)
+            exec(script_code, script_globals)
             print(f"Successfully executed script: {script_name}")
 
         except Exception as e:
             print(f"Error running script '{script_name}': {e}")
 
+    def showEvent(self, event):
+        """Build the script list if a refresh was skipped while hidden."""
+        super().showEvent(event)
+        if self._dirty:
+            self._populate_script_buttons()
+
     def _reload_scripts(self):
         """Reload the scripts list and refresh the buttons."""
         try:
@@ -4,22 +4,30 @@ Segment Widgets for Krita
 This module provides segmentation functionality using Florence-2 + SAM2 pipeline.
 """
 
+import io
+import json
 import os
+import subprocess
+import sys
 import tempfile
 import threading
-from typing import Optional
+import traceback
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory
+from typing import List, Optional
 from krita import Krita, Document, Node  # type: ignore
 from ..compat import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QLabel,
     QProgressBar, QMessageBox, QTextEdit, QComboBox, QRadioButton, QButtonGroup,
-    QThread, pyqtSignal, Qt, QFont, QImage,
+    QObject, pyqtSignal, Qt, QFont, QImage, QTimer, QTextCursor,
 )
 
 # Import configuration from widgets package
 from . import (
     VENV_PYTHON_PATH,
     LAZY_SEGMENT_SCRIPT_PATH,
-    get_temp_input_path,
     get_temp_output_path,
     get_clean_subprocess_env,
     validate_paths,
@@ -28,11 +36,239 @@ from . import (
     DEFAULT_SAM2_MODEL,
     get_sam2_model_options,
     get_sam2_model_key,
+    SEGMENT_SERVER_REPLY_PREFIX,
+    SEGMENT_SERVER_IDLE_TIMEOUT,
+    SEGMENT_CANCEL_TIMEOUT,
+    SEGMENT_DTYPES,
+    DEFAULT_SEGMENT_DTYPE,
 )
 
 
-class SegmentationWorker(QThread):
-    """Worker thread for running segmentation pipeline."""
+class SegmentServer:
+    """Long-lived lazy_segment.py --server process shared by every run.
+
+    Keeps the interpreter and the Florence-2/SAM2 weights loaded between
+    segmentations. Requests are serialized with a lock; the process is shut
+    down after SEGMENT_SERVER_IDLE_TIMEOUT seconds without requests.
+    """
+
+    _instance = None
+
+    @classmethod
+    def instance(cls) -> "SegmentServer":
+        """Return the shared server client, creating it on first use."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self):
+        self.process: Optional[subprocess.Popen] = None
+        self.lock = threading.Lock()
+        self._idle_timer: Optional[threading.Timer] = None
+
+        # stderr is drained by its own thread: the last lines are kept for
+        # error reports and forwarded to the running request, if any
+        self._stderr_tail: deque = deque(maxlen=20)
+        self._stderr_lock = threading.Lock()
+        self._on_progress = None
+
+    def _ensure_started(self):
+        """Launch the server process unless it is already running."""
+        if self.process and self.process.poll() is None:
+            return
+
+        # Run the script as a module: a script's source is compiled on every
+        # launch, while an imported module's bytecode is cached
+        script_dir, script_name = os.path.split(LAZY_SEGMENT_SCRIPT_PATH)
+        module_name = os.path.splitext(script_name)[0]
+        # Don't flash a console window for the server on Windows
+        creationflags = (
+            subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+        )
+        self.process = subprocess.Popen(
+            [VENV_PYTHON_PATH, "-m", module_name, "--server", "--mmap"],
+            cwd=script_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=0,  # Unbuffered so requests are sent immediately
+            env=get_clean_subprocess_env(),  # Use clean environment
+            creationflags=creationflags,
+        )
+        threading.Thread(
+            target=self._drain_stderr, args=(self.process,), daemon=True
+        ).start()
+
+    def _drain_stderr(self, process: subprocess.Popen):
+        """Collect the server's stderr until the process exits."""
+        stream = io.TextIOWrapper(process.stderr, encoding="utf-8", errors="replace")
+        for line in stream:
+            line = line.rstrip()
+            if not line:
+                continue
+            with self._stderr_lock:
+                self._stderr_tail.append(line)
+            on_progress = self._on_progress
+            if on_progress:
+                on_progress(f"[stderr] {line}")
+
+    def _with_stderr(self, message: str) -> str:
+        """Append the stderr lines seen during the request to message."""
+        with self._stderr_lock:
+            tail = list(self._stderr_tail)
+        if not tail:
+            return message
+        return message + "\n" + "\n".join(tail)
+
+    def request(self, payload: dict, on_progress) -> dict:
+        """Send one request and block until its reply.
+
+        Output lines before the reply are passed to on_progress, joined
+        into one message per chunk read from the pipe.
+        """
+        with self.lock:
+            self._cancel_idle_timer()
+            with self._stderr_lock:
+                self._stderr_tail.clear()
+            self._on_progress = on_progress
+            try:
+                self._ensure_started()
+                process = self.process
+                process.stdin.write((json.dumps(payload) + "\n").encode("utf-8"))
+
+                # Read whatever the pipe holds (up to 64 KB) per call instead
+                # of one line per call. selectors can't wait on pipes on
+                # Windows, so this is a plain blocking read in the worker.
+                fd = process.stdout.fileno()
+                partial_line = b""
+                while True:
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        break
+                    lines = (partial_line + chunk).split(b"\n")
+                    partial_line = lines.pop()
+
+                    progress = []
+                    for raw_line in lines:
+                        line = raw_line.decode("utf-8", errors="replace").rstrip("\r")
+                        if line.startswith(SEGMENT_SERVER_REPLY_PREFIX):
+                            if progress:
+                                on_progress("\n".join(progress))
+                            reply = json.loads(line[len(SEGMENT_SERVER_REPLY_PREFIX) :])
+                            if "error" in reply:
+                                reply["error"] = self._with_stderr(reply["error"])
+                            return reply
+                        if line:
+                            progress.append(line)
+                    if progress:
+                        on_progress("\n".join(progress))
+
+                # stdout closed before a reply: the server died or was killed
+                return_code = process.wait()
+                return {
+                    "error": self._with_stderr(
+                        f"Segmentation server exited with return code: {return_code}"
+                    )
+                }
+            finally:
+                self._on_progress = None
+                self._start_idle_timer()
+
+    def prewarm(self):
+        """Start the server ahead of the first request, if idle.
+
+        Its imports (torch, transformers, sam2) then load while the user is
+        still typing instead of after Run is clicked.
+        """
+        if not self.lock.acquire(blocking=False):
+            return  # A request is running, so the server is warm
+        try:
+            if self.process and self.process.poll() is None:
+                return
+            self._cancel_idle_timer()
+            self._ensure_started()
+            self._start_idle_timer()
+        finally:
+            self.lock.release()
+
+    def cancel(self):
+        """Ask the server to abandon the running request.
+
+        The server keeps its models loaded and answers the request with
+        {"cancelled": true} at the next stage boundary.
+        """
+        process = self.process
+        if process and process.poll() is None:
+            try:
+                process.stdin.write(b'{"op": "cancel"}\n')
+            except OSError as e:
+                print(f"Error cancelling segmentation request: {e}")
+
+    def kill(self):
+        """Kill the server immediately, aborting any request in flight."""
+        process = self.process
+        if process and process.poll() is None:
+            process.kill()
+
+    def stop(self):
+        """Shut the server down if no request is running."""
+        if not self.lock.acquire(blocking=False):
+            return  # Busy, so not idle
+        try:
+            process, self.process = self.process, None
+            if process and process.poll() is None:
+                # Closing stdin ends the server's request loop
+                process.stdin.close()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        finally:
+            self.lock.release()
+
+    def _start_idle_timer(self):
+        self._idle_timer = threading.Timer(SEGMENT_SERVER_IDLE_TIMEOUT, self.stop)
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+
+    def _cancel_idle_timer(self):
+        if self._idle_timer:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+
+# Status messages are appended to the log at most once per this interval
+_STATUS_FLUSH_MS = 50
+
+# Lines kept in the status log; older ones are dropped so appends stay cheap
+_STATUS_MAX_LINES = 500
+
+# One long-lived thread does the blocking server I/O for every run, instead
+# of a new QThread per segmentation. The server handles one request at a
+# time anyway, so a single thread loses no concurrency.
+_segment_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="lazy-segment-io"
+)
+
+
+def _shutdown_segmentation():
+    """Kill the server and drop queued requests when Krita quits."""
+    SegmentServer.instance().kill()
+    _segment_executor.shutdown(wait=False)
+
+
+try:
+    Krita.instance().notifier().applicationClosing.connect(_shutdown_segmentation)
+except Exception as e:
+    print(f"Error connecting segmentation shutdown: {e}")
+
+
+class SegmentationWorker(QObject):
+    """Runs one segmentation request on the shared segment I/O thread.
+
+    Signals are emitted from that thread and delivered to GUI-thread slots
+    through queued connections.
+    """
 
     progress_update = pyqtSignal(str)  # Progress message
     finished = pyqtSignal(str)  # Result image path
@@ -40,96 +276,76 @@ class SegmentationWorker(QThread):
 
     def __init__(
         self,
-        image_path: str,
         prompt: str,
         output_path: str,
         output_type: str = "overlay",
         sam2_model: str = "base_plus",
+        shared_image: Optional[dict] = None,
+        dtype: str = "auto",
     ):
         super().__init__()
-        self.image_path = image_path
+        self._future: Optional[Future] = None
         self.prompt = prompt
         self.output_path = output_path
         self.output_type = output_type
         self.sam2_model = sam2_model
+        self.dtype = dtype
+        # {"shm", "width", "height"} of a shared BGRA input buffer, if any
+        self.shared_image = shared_image
+
+    def start(self):
+        """Queue the request on the shared I/O thread."""
+        self._future = _segment_executor.submit(self.run)
+
+    def isRunning(self) -> bool:
+        """Whether the request is queued or in progress."""
+        return self._future is not None and not self._future.done()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the request has finished; False if timeout ran out."""
+        if self._future is not None:
+            try:
+                self._future.exception(timeout)  # run() reports its own errors
+            except FutureTimeoutError:
+                return False
+        return True
 
     def run(self):
-        """Run the segmentation pipeline in a separate thread."""
+        """Run the segmentation pipeline on the I/O thread."""
         try:
             self.progress_update.emit("Initializing Florence-2 + SAM2 pipeline...")
 
-            # Use subprocess to run the segmentation with the correct Python environment
-            import subprocess
-            import sys
-            import os
-
-            # Validate paths before proceeding
-            path_errors = validate_paths()
-            if path_errors:
-                for error in path_errors:
-                    self.error.emit(error)
-                return
-
-            # Run the segmentation script as subprocess
+            # Hand the request to the persistent server; the first run starts
+            # it and loads the models, later runs reuse them
             self.progress_update.emit("Running segmentation pipeline...")
 
-            cmd = [
-                VENV_PYTHON_PATH,
-                LAZY_SEGMENT_SCRIPT_PATH,
-                self.image_path,
-                self.prompt,
-                self.output_path,
-            ]
-
-            # Add cutout flag if needed
-            if self.output_type == "cutout":
-                cmd.append("--cutout")
-
-            # Add model selection if not default
-            if self.sam2_model != DEFAULT_SAM2_MODEL:
-                cmd.extend(["--model", self.sam2_model])
-
-            # Get clean environment to avoid Python path conflicts with Krita
-            clean_env = get_clean_subprocess_env()
-
-            # Run the command and capture output
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                universal_newlines=True,
-                env=clean_env,  # Use clean environment
+            payload = {
+                "prompt": self.prompt,
+                "output_path": self.output_path,
+                "output_type": self.output_type,
+                "model": self.sam2_model,
+                "dtype": self.dtype,
+            }
+            if self.shared_image:
+                payload.update(self.shared_image)
+
+            reply = SegmentServer.instance().request(
+                payload, self.progress_update.emit
             )
 
-            # Read output in real-time
-            while True:
-                output = process.stdout.readline()
-                if output == "" and process.poll() is not None:
-                    break
-                if output:
-                    self.progress_update.emit(output.strip())
-
-            # Wait for completion
-            return_code = process.poll()
-
-            if return_code == 0:
-                # Check if output was created
-                if os.path.exists(self.output_path):
-                    self.progress_update.emit("Segmentation completed successfully!")
-                    self.finished.emit(self.output_path)
-                else:
-                    self.error.emit(
-                        "Segmentation completed but no output file was generated"
-                    )
+            if reply.get("cancelled"):
+                return  # Reported by cancel_segmentation
+            if "error" in reply:
+                self.error.emit(reply["error"])
+            elif os.path.exists(reply.get("path", "")):
+                self.progress_update.emit("Segmentation completed successfully!")
+                self.finished.emit(reply["path"])
             else:
                 self.error.emit(
-                    f"Segmentation process failed with return code: {return_code}"
+                    "Segmentation completed but no output file was generated"
                 )
 
         except Exception as e:
-            import traceback
-
             self.error.emit(f"Segmentation error: {str(e)}\\n{traceback.format_exc()}")
 
 
@@ -140,6 +356,19 @@ class SegmentSection(QWidget):
         super().__init__(parent)
         self.parent_docker = parent
         self.worker_thread = None
+        # Set once validate_paths() passes; a failed check is retried so a
+        # venv installed later is picked up without restarting Krita
+        self._paths_valid = False
+        # Input pixels shared with the server for the running request
+        self._input_shm: Optional[shared_memory.SharedMemory] = None
+
+        # Progress lines waiting for the next status flush
+        self._status_buffer: List[str] = []
+        self._status_timer = QTimer(self)
+        self._status_timer.setSingleShot(True)
+        self._status_timer.setInterval(_STATUS_FLUSH_MS)
+        self._status_timer.timeout.connect(self._flush_status)
+
         self.setup_ui()
 
     def setup_ui(self):
@@ -158,6 +387,7 @@ class SegmentSection(QWidget):
         self.prompt_input = QLineEdit()
         self.prompt_input.setPlaceholderText("e.g., girl, car, person with hat...")
         self.prompt_input.returnPressed.connect(self.run_segmentation)
+        self.prompt_input.textEdited.connect(self._prewarm_server)
         prompt_layout.addWidget(self.prompt_input)
 
         layout.addLayout(prompt_layout)
@@ -175,16 +405,33 @@ class SegmentSection(QWidget):
             self.model_combo.addItem(display_name, model_key)
 
         # Set default selection
-        default_index = 0
-        for i in range(self.model_combo.count()):
-            if self.model_combo.itemData(i) == DEFAULT_SAM2_MODEL:
-                default_index = i
-                break
-        self.model_combo.setCurrentIndex(default_index)
+        self.model_combo.setCurrentIndex(
+            max(self.model_combo.findData(DEFAULT_SAM2_MODEL), 0)
+        )
 
         model_layout.addWidget(self.model_combo)
         layout.addLayout(model_layout)
 
+        # Inference precision selection
+        dtype_layout = QVBoxLayout()
+        dtype_layout.setSpacing(3)
+
+        dtype_label = QLabel("Precision:")
+        dtype_layout.addWidget(dtype_label)
+
+        self.dtype_combo = QComboBox()
+        for dtype_key, display_name in SEGMENT_DTYPES.items():
+            self.dtype_combo.addItem(display_name, dtype_key)
+        self.dtype_combo.setCurrentIndex(
+            max(self.dtype_combo.findData(DEFAULT_SEGMENT_DTYPE), 0)
+        )
+        self.dtype_combo.setToolTip(
+            "Auto uses BF16 (or FP16) on CUDA GPUs and FP32 on CPU"
+        )
+
+        dtype_layout.addWidget(self.dtype_combo)
+        layout.addLayout(dtype_layout)
+
         # Output type selection
         output_type_layout = QVBoxLayout()
         output_type_layout.setSpacing(3)
@@ -280,6 +527,7 @@ class SegmentSection(QWidget):
         self.status_text = QTextEdit()
         self.status_text.setMaximumHeight(100)
         self.status_text.setReadOnly(True)
+        self.status_text.document().setMaximumBlockCount(_STATUS_MAX_LINES)
         self.status_text.setVisible(False)
         self.status_text.setStyleSheet(
             """
@@ -297,8 +545,24 @@ class SegmentSection(QWidget):
 
         self.setLayout(layout)
 
+    def _prewarm_server(self, *args):
+        """Start the segmentation server once the user begins typing a prompt."""
+        try:
+            if not self._paths_valid:
+                if validate_paths():
+                    return  # Reported properly when Run is clicked
+                self._paths_valid = True
+            SegmentServer.instance().prewarm()
+        except Exception as e:
+            print(f"Error starting segmentation server: {e}")
+
     def run_segmentation(self):
         """Run the segmentation process."""
+        # Enter in the prompt field can start a run while one is in flight;
+        # the shared input buffer and worker signals belong to that run
+        if self.worker_thread and self.worker_thread.isRunning():
+            return
+
         try:
             # Get current document
             doc = Krita.instance().activeDocument()
@@ -308,6 +572,16 @@ class SegmentSection(QWidget):
                 )
                 return
 
+            # Validate paths before exporting anything
+            if not self._paths_valid:
+                path_errors = validate_paths()
+                if path_errors:
+                    QMessageBox.critical(
+                        self, "Segmentation Error", "\n".join(path_errors)
+                    )
+                    return
+                self._paths_valid = True
+
             # Get prompt
             prompt = self.prompt_input.text().strip()
             if not prompt:
@@ -320,14 +594,13 @@ class SegmentSection(QWidget):
             output_type = "cutout" if self.cutout_radio.isChecked() else "overlay"
             selected_model = self.model_combo.currentData()
 
-            # Get temporary file paths from configuration
-            input_path = get_temp_input_path()
+            # Get temporary output path from configuration
             output_path = get_temp_output_path(output_type)
 
-            # Export current document as PNG
             self.update_status("Exporting current document...")
 
-            # Get the flattened image as pixel data and save it
+            # Share the flattened image's raw pixels with the server instead
+            # of encoding a PNG here and decoding it again there
             try:
                 # Get document dimensions
                 width = doc.width()
@@ -335,21 +608,26 @@ class SegmentSection(QWidget):
 
                 # Get pixel data from the projection (flattened view)
                 pixel_data = doc.pixelData(0, 0, width, height)
-
-                # Convert to QImage
-                qimage = QImage(pixel_data, width, height, QImage.Format_ARGB32)
-
-                # Convert ARGB to RGB for better compatibility
-                rgb_image = qimage.convertToFormat(QImage.Format_RGB32)
-
-                # Save as PNG
-                if not rgb_image.save(input_path, "PNG"):
+                if len(pixel_data) != width * height * 4:
                     QMessageBox.critical(
-                        self, "Export Error", "Failed to save document as PNG."
+                        self,
+                        "Export Error",
+                        "Only 8-bit RGBA documents can be segmented.",
                     )
                     return
 
+                self._input_shm = shared_memory.SharedMemory(
+                    create=True, size=len(pixel_data)
+                )
+                self._input_shm.buf[: len(pixel_data)] = pixel_data
+                shared_image = {
+                    "shm": self._input_shm.name,
+                    "width": width,
+                    "height": height,
+                }
+
             except Exception as export_error:
+                self._release_input_buffer()
                 QMessageBox.critical(
                     self,
                     "Export Error",
@@ -361,7 +639,12 @@ class SegmentSection(QWidget):
             self.start_processing()
 
             self.worker_thread = SegmentationWorker(
-                input_path, prompt, output_path, output_type, selected_model
+                prompt,
+                output_path,
+                output_type,
+                selected_model,
+                shared_image=shared_image,
+                dtype=self.dtype_combo.currentData(),
             )
             self.worker_thread.progress_update.connect(self.update_status)
             self.worker_thread.finished.connect(self.on_segmentation_finished)
@@ -377,8 +660,16 @@ class SegmentSection(QWidget):
     def cancel_segmentation(self):
         """Cancel the running segmentation."""
         if self.worker_thread and self.worker_thread.isRunning():
-            self.worker_thread.terminate()
-            self.worker_thread.wait()
+            # The server abandons the request and keeps its models loaded;
+            # it is only killed if it does not answer in time. Either reply
+            # is not reported since the user asked for it
+            self.worker_thread.finished.disconnect(self.on_segmentation_finished)
+            self.worker_thread.error.disconnect(self.on_segmentation_error)
+            server = SegmentServer.instance()
+            server.cancel()
+            if not self.worker_thread.wait(SEGMENT_CANCEL_TIMEOUT):
+                server.kill()
+                self.worker_thread.wait()
             self.update_status("Segmentation cancelled by user.")
             self.stop_processing()
 
@@ -389,6 +680,7 @@ class SegmentSection(QWidget):
         self.progress_bar.setVisible(True)
         self.status_text.setVisible(True)
         self.status_text.clear()
+        self._status_buffer.clear()
         self.update_status("Starting segmentation process...")
 
     def stop_processing(self):
@@ -398,13 +690,33 @@ class SegmentSection(QWidget):
         self.progress_bar.setVisible(False)
         # Keep status text visible to show results
 
+        # The server is done with the input pixels once the request ends
+        self._release_input_buffer()
+
+    def _release_input_buffer(self):
+        """Free the shared input pixels block."""
+        if self._input_shm is not None:
+            try:
+                self._input_shm.close()
+                self._input_shm.unlink()
+            except Exception as e:
+                print(f"Error releasing segmentation input buffer: {e}")
+            self._input_shm = None
+
     def update_status(self, message: str):
-        """Update the status text."""
-        self.status_text.append(message)
+        """Queue a status message; bursts are appended together."""
+        self._status_buffer.append(message)
+        if not self._status_timer.isActive():
+            self._status_timer.start()
+
+    def _flush_status(self):
+        """Append the queued status messages with a single layout pass."""
+        if not self._status_buffer:
+            return
+        self.status_text.append("\n".join(self._status_buffer))
+        self._status_buffer.clear()
         # Auto-scroll to bottom
-        cursor = self.status_text.textCursor()
-        cursor.movePosition(cursor.End)
-        self.status_text.setTextCursor(cursor)
+        self.status_text.moveCursor(QTextCursor.End)
 
     def on_segmentation_finished(self, output_path: str):
         """Handle successful segmentation completion."""
@@ -425,9 +737,6 @@ class SegmentSection(QWidget):
             model_name = SAM2_MODELS[selected_model]["name"]
             layer_name = f"AI Segment ({output_type.title()}, {model_name}): {prompt}"
 
-            # Load the segmented image using Krita's createNodeFromPaintDevice
-            from krita import QImage  # type: ignore
-
             # Load the result image
             qimage = QImage(output_path)
             if qimage.isNull():
@@ -438,17 +747,20 @@ class SegmentSection(QWidget):
             root_node = doc.rootNode()
             paint_layer = doc.createNode(layer_name, "paintLayer")
 
-            # Convert QImage to the format Krita expects
-            if qimage.format() != QImage.Format_ARGB32:
+            # Convert QImage to the format Krita expects. RGB32 (what the JPG
+            # overlay loads as) already has the same BGRA byte layout with
+            # opaque alpha, so only other formats need a converted copy
+            if qimage.format() not in (QImage.Format_ARGB32, QImage.Format_RGB32):
                 qimage = qimage.convertToFormat(QImage.Format_ARGB32)
 
             # Get image dimensions
             width = qimage.width()
             height = qimage.height()
 
-            # Get pixel data as bytes
+            # Read the pixels in one block; 32-bit rows are never padded, so
+            # the buffer is exactly width * height * 4 bytes
             ptr = qimage.constBits()
-            pixel_bytes = ptr.asstring(width * height * 4)  # 4 bytes per pixel (ARGB)
+            pixel_bytes = ptr.asstring(qimage.bytesPerLine() * height)
 
             # Set the pixel data on the layer
             paint_layer.setPixelData(pixel_bytes, 0, 0, width, height)
@@ -462,18 +774,13 @@ class SegmentSection(QWidget):
             self.update_status(f"✅ Added new layer: '{layer_name}'")
             self.update_status("🎉 Segmentation process completed successfully!")
 
-            # Clean up temporary files
+            # Clean up the temporary result file
             try:
                 os.remove(output_path)
-                temp_input = get_temp_input_path()
-                if os.path.exists(temp_input):
-                    os.remove(temp_input)
             except:
                 pass  # Ignore cleanup errors
 
         except Exception as e:
-            import traceback
-
             self.update_status(f"❌ Error adding layer: {str(e)}")
             self.update_status(f"Stack trace: {traceback.format_exc()}")
             QMessageBox.critical(